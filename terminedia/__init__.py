@@ -13,10 +13,10 @@ if sys.platform == "win32":
     import colorama
     colorama.init(convert=True)
 
-from terminedia.input import keyboard, inkey, pause, KeyCodes, getch
+from terminedia.input import keyboard, inkey, pause, KeyCodes, getch, agetch, AsyncKeyboard
 from terminedia.utils import Color, Rect, V2, Gradient, ColorGradient
 from terminedia.sprites import Sprite
-from terminedia.terminal import ScreenCommands, JournalingScreenCommands
+from terminedia.terminal import ScreenCommands, JournalingScreenCommands, ByteSink
 from terminedia.values import (
     Directions,
     Effects,
@@ -27,7 +27,7 @@ from terminedia.values import (
     NOP,
 )
 from terminedia.image import shape, ValueShape, ImageShape, PalettedShape, FullShape
-from terminedia.screen import Screen
+from terminedia.screen import Screen, FramePacer
 from terminedia.subpixels import BlockChars
 from terminedia.text import render
 from terminedia.text.style import Mark
@@ -6,8 +6,200 @@ from io import StringIO
 
 from terminedia.unicode import char_width
 from terminedia.unicode_transforms import translate_chars
-from terminedia.utils import V2, Color
-from terminedia.values import DEFAULT_BG, DEFAULT_FG, Effects, UNICODE_EFFECTS, ESC
+from terminedia.utils import V2, Color, Rect
+from terminedia.values import DEFAULT_BG, DEFAULT_FG, Effects, UNICODE_EFFECTS, ESC, TRANSPARENT, CONTINUATION
+
+
+def color_key(color):
+    """Packed integer value of a color (see :any:`Color.packed`)
+
+    Accepts Color instances, including the special colors, and any value
+    taken by the Color constructor.
+    """
+    try:
+        return color.packed
+    except AttributeError:
+        return Color(color).packed
+
+
+def cell_key(char, foreground, background, effects):
+    """Hashable representation of the visible contents of a cell
+
+    Colors are represented by their packed integer values, so that
+    changes to a mutable Color instance after it was rendered are detected.
+    """
+    return (
+        char if char is not TRANSPARENT else None,
+        color_key(foreground),
+        color_key(background),
+        effects if effects is not TRANSPARENT else None,
+    )
+
+
+class FrontBuffer:
+    """Record of the contents currently displayed on an output
+
+    Used by the backends' ``diff_render`` method, to find out which
+    cells have to be issued in order to display the contents
+    of a shape: only cells whose character, colors or effects
+    differ from the recorded ones are rendered. Unchanged
+    rows are skipped after a single list comparison.
+
+    Rows that were never rendered, or that were invalidated, are rendered in full.
+
+    Args:
+      - size (2-sequence): width and height of the output.
+    """
+
+    def __init__(self, size):
+        self.size = V2(size)
+        self.invalidate()
+
+    def invalidate(self, rect=None):
+        """Marks an area (by default, all the output) as having unknown contents"""
+        width, height = self.size
+        if rect is None:
+            self.rows = [None] * height
+            return
+        rect = Rect(rect)
+        for y in range(max(0, rect.top), min(rect.bottom, height)):
+            row = self.rows[y]
+            if row is None:
+                continue
+            for x in range(max(0, rect.left), min(rect.right, width)):
+                row[x] = None
+
+    def set_cell(self, pos, char, foreground, background, effects):
+        """Records a cell that was displayed by some other means than ``changed_cells``"""
+        x, y = pos
+        if not (0 <= x < self.size[0] and 0 <= y < self.size[1]):
+            return
+        if self.rows[y] is None:
+            self.rows[y] = [None] * self.size[0]
+        self.rows[y][x] = cell_key(char, foreground, background, effects)
+
+    def displayed_text(self, y, x0, x1, attrs):
+        """Text displayed in a span of a row, if known to be plain text with the given attributes
+
+        Args:
+          - y, x0, x1: row and span limits
+          - attrs: (foreground, background, effects) keys - packed colors and integer effect flags
+
+        Returns None if any cell in the span is unknown, has other attributes,
+        or its character is not a single width, single code point one.
+        Used by renderers to re-print cells instead of moving the cursor over them.
+        """
+        row = self.rows[y] if 0 <= y < len(self.rows) else None
+        if row is None:
+            return None
+        foreground, background, effects = attrs
+        chars = []
+        for key in row[x0:x1]:
+            if key is None or key[1] != foreground or key[2] != background or key[3] is None or int(key[3]) != effects:
+                return None
+            char = key[0]
+            if char is None or len(char) != 1 or not (char.isascii() and char.isprintable() or char_width(char) == 1):
+                return None
+            chars.append(char)
+        return "".join(chars) if len(chars) == x1 - x0 else None
+
+    def changed_cells(self, data, rects=None):
+        """Yields the cells in data that differ from the displayed contents
+
+        Args:
+          - data (Shape): contents to be displayed
+          - rects (Optional[Iterable[Rect]]): If given, only rows crossing these areas are checked.
+
+        Yields (x, y, char, foreground, background, effects) tuples in
+        left-right, top-down order. The buffer is updated to reflect that
+        the yielded cells were displayed.
+        """
+        width, height = self.size
+        width = min(width, data.width)
+        height = min(height, data.height)
+        if rects is None:
+            rows = range(height)
+        else:
+            rows = set()
+            for rect in rects:
+                rect = Rect(rect)
+                rows.update(range(max(0, rect.top), min(rect.bottom, height)))
+            rows = sorted(rows)
+        # Snapshots shared by several buffers compute the keys only once
+        row_keys = getattr(data, "row_keys", None)
+
+        for y in rows:
+            row = data.get_row(y, 0, width)
+            old_keys = self.rows[y]
+            if row_keys is not None:
+                keys = list(row_keys(y, width))
+            else:
+                keys = [cell_key(*cell) for cell in zip(*row)]
+            if old_keys is not None:
+                # Transparent cells keep whatever is displayed:
+                for x, key in enumerate(keys):
+                    if key[0] is None:
+                        keys[x] = old_keys[x]
+            if old_keys is not None and keys == (old_keys if width == len(old_keys) else old_keys[:width]):
+                continue
+            changed = [x for x in range(width) if old_keys is None or keys[x] != old_keys[x]]
+            self.rows[y] = keys + ([None] * (self.size[0] - width))
+            if not changed:
+                continue
+            # Double width characters and their continuation cells are always issued together
+            chars = row[0]
+            to_render = set(changed)
+            for x in changed:
+                if chars[x] == CONTINUATION and x > 0:
+                    to_render.add(x - 1)
+                if x + 1 < width and chars[x + 1] == CONTINUATION:
+                    to_render.add(x + 1)
+            for x in sorted(to_render):
+                if keys[x] is None or keys[x][0] is None:
+                    continue
+                yield (x, y, row[0][x], row[1][x], row[2][x], row[3][x])
+
+
+class FrameSnapshot:
+    """Copy of the rows of a shape that changed, taken to be rendered later
+
+    Args:
+      - size (2-sequence): width and height of the original shape
+      - rows (dict): maps row numbers to the full-width row contents,
+            as returned by ``Shape.get_row``
+
+    Renderers only read the snapshot through ``get_row``, so it can stand for the
+    original shape in ``diff_render`` or ``fast_render`` calls made while the
+    original keeps being drawn on.
+    """
+
+    def __init__(self, size, rows):
+        self.size = V2(size)
+        self.width, self.height = self.size
+        self.rows = rows
+        self._keys = {}
+
+    def get_row(self, y, x0=0, x1=None):
+        row = self.rows.get(y)
+        if row is None:
+            # Not captured: nothing to display
+            width = max(0, min(self.width if x1 is None else x1, self.width) - max(0, x0))
+            return tuple([TRANSPARENT] * width for _ in range(4))
+        return tuple(channel[x0:x1] for channel in row)
+
+    def row_keys(self, y, width):
+        """Cell keys (see :any:`cell_key`) for the start of a row, computed once"""
+        try:
+            return self._keys[y, width]
+        except KeyError:
+            pass
+        keys = self._keys[y, width] = tuple(cell_key(*cell) for cell in zip(*self.get_row(y, 0, width)))
+        return keys
+
+    @property
+    def rects(self):
+        """Areas covered by the snapshot, one for each row"""
+        return [Rect((0, y), (self.width, y + 1)) for y in sorted(self.rows)]
 
 
 class BackendColorContextMixin:
@@ -89,8 +281,19 @@ class JournalingCommandsMixin(BackendColorContextMixin):
     regardless of the order in which they were drawn inside
     the context managed block.
 
+    Only the latest write to each position is kept, in ``journal``:
+    a list of rows, each a list of (char, foreground, background, effects)
+    entries indexed by column, with None for positions not written to.
+    If ``keep_history`` is set, all writes are also recorded,
+    along with a sequential tick, in ``journal_history``.
+
     """
 
+    #: Whether to record every write in a block in ``journal_history``,
+    #: besides the latest one for each position in ``journal``
+    keep_history = False
+    journal_history = None
+
     def __init__(self, **kwargs):
         """__init__ initializes internal attributes"""
         self.in_block = 0
@@ -111,7 +314,8 @@ class JournalingCommandsMixin(BackendColorContextMixin):
         when the outer context is ended.
         """
         if self.in_block == 0:
-            self.journal = {}
+            self.journal = []
+            self.journal_history = {} if self.keep_history else None
         self.tick = 0
         self.in_block += 1
 
@@ -127,16 +331,23 @@ class JournalingCommandsMixin(BackendColorContextMixin):
         """
         if not self.in_block:
             raise RuntimeError("Journal not open")
-        self.journal.setdefault(pos, []).append(
-            (
-                self.tick,
-                char,
-                self.current_color,
-                self.current_background,
-                self.current_effect,
-            )
-        )
+        entry = (char, self.current_color, self.current_background, self.current_effect)
+        if self.journal_history is not None:
+            self.journal_history.setdefault(pos, []).append((self.tick,) + entry)
         self.tick += 1
+        x, y = pos
+        if x < 0 or y < 0:
+            # Can't be displayed
+            return
+        journal = self.journal
+        if y >= len(journal):
+            journal.extend([None] * (y + 1 - len(journal)))
+        row = journal[y]
+        if row is None:
+            row = journal[y] = []
+        if x >= len(row):
+            row.extend([None] * (x + 1 - len(row)))
+        row[x] = entry
 
     def __exit__(self, exc_name, traceback, frame):
         """Exists a managed context.
@@ -192,8 +403,7 @@ class JournalingCommandsMixin(BackendColorContextMixin):
         else:
             writer = lambda char: self._print(char, file=file)
 
-        for pos in sorted(self.journal, key=lambda pos: (pos[1], pos[0])):
-            tick, char, color, bg, effect = self.journal[pos][-1]
+        for pos, (char, color, bg, effect) in self._journal_entries():
             call = []
 
             if pos != last_pos:
@@ -225,6 +435,15 @@ class JournalingCommandsMixin(BackendColorContextMixin):
         if not original_file and single_write:
             self._print(file.getvalue())
 
+    def _journal_entries(self):
+        """Yields the latest (pos, entry) pairs for each position, in left-right, top-down order"""
+        for y, row in enumerate(self.journal):
+            if row is None:
+                continue
+            for x, entry in enumerate(row):
+                if entry is not None:
+                    yield V2(x, y), entry
+
     def print_at(self, pos, txt, file=None):
         """Positions the cursor and prints a text sequence
 
@@ -0,0 +1,200 @@
+"""Serves the contents of a shape to several terminals at once, over sockets
+"""
+import os
+import socket
+
+from terminedia.backend_common import FrameSnapshot, FrontBuffer
+from terminedia.terminal import ScreenCommands
+from terminedia.utils import Rect, V2
+
+
+class BroadcastClient:
+    """A terminal receiving the frames rendered by a :any:`Broadcaster`
+
+    Args:
+      - sock (socket.socket): connected socket. It is set to non-blocking mode.
+      - size (2-sequence): size of the broadcast contents
+      - color_depth (int): colors supported by the client terminal: 24, 8 or 4 bits.
+      - run_length_encoding (bool): whether the client terminal supports the REP and ECH sequences.
+
+    Each client has its own record of the displayed contents, cursor position
+    and attributes, so that it only receives what changed for it. Output
+    that the socket does not take at once is kept, and the client skips frames
+    until it is sent: the next frame it gets carries all changes since then.
+    """
+
+    def __init__(self, sock, size, color_depth=24, run_length_encoding=False):
+        self.sock = sock
+        sock.setblocking(False)
+        self.commands = ScreenCommands(color_depth=color_depth, run_length_encoding=run_length_encoding)
+        self.front_buffer = FrontBuffer(size)
+        self.state = {"last_pos": None}
+        # Late joiners start from a cleared screen and get a full frame
+        self.pending = bytearray(b"\x1b[0m\x1b[2J")
+        self.resync = True
+        self.closed = False
+
+    def send_frame(self, snapshot, rects=None):
+        """Encodes and sends the changes in a frame
+
+        Args:
+          - snapshot (FrameSnapshot): frame contents
+          - rects (Optional[Iterable[Rect]]): areas changed since the previous frame.
+              Ignored if the client needs a full comparison.
+
+        Returns False if the frame was skipped because the client is still busy.
+        """
+        self.flush()
+        if self.pending or self.closed:
+            self.resync = True
+            return False
+        if self.resync:
+            rects = None
+            self.resync = False
+        text = self.commands.encode_cells(
+            self.front_buffer.changed_cells(snapshot, rects), self.state,
+            width=snapshot.width, known=self.front_buffer.displayed_text
+        )
+        self.pending += text.encode("utf-8")
+        self.flush()
+        return True
+
+    def flush(self):
+        """Sends as much of the pending output as the socket takes without blocking"""
+        if not self.pending or self.closed:
+            return
+        try:
+            sent = self.sock.send(self.pending)
+        except BlockingIOError:
+            return
+        except OSError:
+            self.close()
+            return
+        del self.pending[:sent]
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def close(self):
+        self.closed = True
+        self.pending.clear()
+        self.sock.close()
+
+
+class Broadcaster:
+    """Renders a shape once per frame, and sends it to any number of terminal clients
+
+    Args:
+      - data (Shape): contents to broadcast - e.g. ``Screen.data``
+      - color_depth (int): default color depth for clients
+      - run_length_encoding (bool): default REP/ECH support for clients
+
+    Clients either connect to a listening socket (see :any:`Broadcaster.listen`)
+    or are added with already connected sockets, through :any:`Broadcaster.add_client`.
+    Call :any:`Broadcaster.broadcast` for each frame: the contents are composed
+    (with sprites and transformers applied) once, and each client gets
+    the differences from what it currently displays.
+    """
+
+    def __init__(self, data, color_depth=24, run_length_encoding=False):
+        self.data = data
+        self.color_depth = color_depth
+        self.run_length_encoding = run_length_encoding
+        self.clients = []
+        self.server = None
+        self.address = None
+
+    @property
+    def size(self):
+        return V2(self.data.size)
+
+    def listen(self, address, backlog=5):
+        """Starts listening for client connections
+
+        Args:
+          - address (Union[str, tuple]): a filesystem path for a Unix socket,
+              or a (host, port) pair for a TCP socket.
+          - backlog (int): passed to ``socket.listen``
+
+        Connections are accepted on each call to :any:`Broadcaster.broadcast`.
+        """
+        if isinstance(address, (str, bytes, os.PathLike)):
+            family = socket.AF_UNIX
+        else:
+            family = socket.AF_INET6 if ":" in address[0] else socket.AF_INET
+        server = socket.socket(family, socket.SOCK_STREAM)
+        if family != socket.AF_UNIX:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(address)
+        server.listen(backlog)
+        server.setblocking(False)
+        self.server = server
+        self.address = server.getsockname()
+
+    def accept(self):
+        """Accepts any pending connections to the listening socket"""
+        if self.server is None:
+            return
+        while True:
+            try:
+                sock, _ = self.server.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            self.add_client(sock)
+
+    def add_client(self, sock, **kwargs):
+        """Adds a connected socket as a client
+
+        Args:
+          - sock (socket.socket): the client connection
+          - \\*\\*kwargs: options for :any:`BroadcastClient`, overriding the broadcaster defaults.
+
+        Returns the new :any:`BroadcastClient`
+        """
+        options = {"color_depth": self.color_depth, "run_length_encoding": self.run_length_encoding}
+        options.update(kwargs)
+        client = BroadcastClient(sock, self.size, **options)
+        self.clients.append(client)
+        return client
+
+    def broadcast(self, rects=None):
+        """Sends a frame to all clients
+
+        Args:
+          - rects (Optional[Iterable[Rect]]): areas changed since the previous frame -
+              e.g. ``screen.data.dirty_rects``, read before ``screen.update()``
+              clears them. Defaults to the whole contents.
+
+        Returns the number of clients that received the frame.
+        """
+        self.accept()
+        if not self.clients:
+            return 0
+        width, height = self.size
+        if rects is None or any(client.resync for client in self.clients):
+            rows = range(height)
+        else:
+            rows = set()
+            for rect in rects:
+                rect = Rect(rect)
+                rows.update(range(max(0, rect.top), min(rect.bottom, height)))
+        snapshot = FrameSnapshot(self.size, {y: self.data.get_row(y) for y in rows})
+        sent = 0
+        for client in self.clients:
+            sent += client.send_frame(snapshot, rects)
+        self.clients = [client for client in self.clients if not client.closed]
+        return sent
+
+    def close(self):
+        """Disconnects all clients and stops listening"""
+        for client in self.clients:
+            client.close()
+        self.clients = []
+        if self.server is not None:
+            self.server.close()
+            if self.server.family == socket.AF_UNIX and isinstance(self.address, str):
+                try:
+                    os.unlink(self.address)
+                except OSError:
+                    pass
+            self.server = None
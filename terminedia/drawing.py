@@ -18,7 +18,7 @@ class Drawing:
     That is - the typical usage for methods here will be ``screen.draw.line((0,0)-(50,20))``
     """
 
-    def __init__(self, set_fn, reset_fn, size_fn, context):
+    def __init__(self, set_fn, reset_fn, size_fn, context, target=None):
         """Not intented to be instanced directly -
 
         Args:
@@ -26,6 +26,8 @@ class Drawing:
           - reset_fn (callable): function to reset a pixel
           - size_fn (callable): function to retrieve the width and height of the output
           - context : namespace where screen attributes are set
+          - target (Optional[Shape]): shape being drawn on, if any. Allows
+                operations to use fast paths writting directly to the shape storage.
 
         This takes note of the callback functions for
         owner-size, pixels set and reset and the drawing context.
@@ -41,6 +43,7 @@ class Drawing:
         self.reset = reset_fn
         self._size = size_fn
         self.context = context
+        self.target = target
 
     @property
     def size(self):
@@ -268,7 +271,7 @@ class Drawing:
         support for other Pixel capabilities is not yet implemented.
 
         """
-        from terminedia.image import Shape, PalettedShape, SKIP_LINE
+        from terminedia.image import Shape, PalettedShape
 
         if not hasattr(self.context, "color_stack"):
             self.context.color_stack = []
@@ -297,68 +300,75 @@ class Drawing:
             roi = Rect(roi)
             shape = shape[roi]
 
+        pos = V2(pos)
+        fast_blit = getattr(self.target, "_fast_blit", None)
+        if fast_blit and fast_blit(pos, shape, extent=extent, erase=erase, blit_pixel=self._blit_pixel):
+            self.context.color = self.context.color_stack.pop()
+            self.context.background = self.context.background_stack.pop()
+            return
+
         direct_pix = len(inspect.signature(self.set).parameters) >= 2
 
-        ishape = iter(shape)
-        while True:
-            pixel_pos, pixel = next(ishape, (None, None))
-            if pixel_pos is None:
-                break
-            target_pos = pos + pixel_pos
-            if extent and (target_pos.x >= extent.x or target_pos.y >= extent.y):
-                ishape.send(SKIP_LINE)
-                continue
-            should_set = (
-                pixel.capabilities.value_type == str
-                and (
-                    pixel.value != EMPTY
-                    or pixel.value == "."
-                    and pixel.capabilities.translate_dots
-                )
-                or pixel.capabilities.value_type == bool
-                and pixel.value
-            )
-            if not should_set and not erase:
-                continue
-            if direct_pix:
-                if (
-                    pixel.capabilities.has_foreground and pixel.foreground == CONTEXT_COLORS or
-                    pixel.capabilities.has_background and pixel.background == CONTEXT_COLORS
-                ):
-                    _cls = pixel.__class__
-                    values = [pixel.value]
-                    if pixel.capabilities.has_foreground:
-                        values.append(
-                        pixel.foreground if pixel.foreground != CONTEXT_COLORS else self.context.color_stack[-1]
-                    )
-                    if pixel.capabilities.has_background:
-                        values.append(
-                        pixel.background if pixel.foreground != CONTEXT_COLORS else self.context.background_stack[-1]
-                    )
-                    if pixel.capabilities.has_effects:
-                        values.append(pixel.effects)
-
-                    pixel = _cls(*values)
-                self.set(target_pos, pixel)
-            else:
+        PixelCls = shape.PixelCls
+        value_is_str = PixelCls.capabilities.value_type == str
+
+        width, height = shape.width, shape.height
+        if extent:
+            width = min(width, extent.x - pos.x)
+            height = min(height, extent.y - pos.y)
+
+        # Contents are read a row at a time: Pixel objects are only
+        # created for the positions that will actually be set.
+        for y in range(height):
+            row = shape.get_row(y, 0, width)
+            for x, values in enumerate(zip(*row)):
+                value = values[0]
+                should_set = value != EMPTY if value_is_str else bool(value)
+                if not should_set and not erase:
+                    continue
+                self._blit_pixel(pos + (x, y), PixelCls(*values), should_set, direct_pix)
+
+        self.context.color = self.context.color_stack.pop()
+        self.context.background = self.context.background_stack.pop()
+
+    def _blit_pixel(self, target_pos, pixel, should_set, direct_pix=True):
+        """Internal - sets a single pixel read from a blit source on the target"""
+        if direct_pix:
+            if (
+                pixel.capabilities.has_foreground and pixel.foreground == CONTEXT_COLORS or
+                pixel.capabilities.has_background and pixel.background == CONTEXT_COLORS
+            ):
+                _cls = pixel.__class__
+                values = [pixel.value]
                 if pixel.capabilities.has_foreground:
-                    if pixel.foreground == CONTEXT_COLORS:
-                        self.context.color = self.context.color_stack[-1]
-                    else:
-                        self.context.color = pixel.foreground
+                    values.append(
+                    pixel.foreground if pixel.foreground != CONTEXT_COLORS else self.context.color_stack[-1]
+                )
                 if pixel.capabilities.has_background:
-                    if pixel.background == CONTEXT_COLORS:
-                        self.context.background = self.context.background_stack[-1]
-                    else:
-                        self.context.background = pixel.background
+                    values.append(
+                    pixel.background if pixel.foreground != CONTEXT_COLORS else self.context.background_stack[-1]
+                )
+                if pixel.capabilities.has_effects:
+                    values.append(pixel.effects)
 
-                if should_set:
-                    self.set(target_pos)
+                pixel = _cls(*values)
+            self.set(target_pos, pixel)
+        else:
+            if pixel.capabilities.has_foreground:
+                if pixel.foreground == CONTEXT_COLORS:
+                    self.context.color = self.context.color_stack[-1]
                 else:
-                    self.reset(target_pos)
+                    self.context.color = pixel.foreground
+            if pixel.capabilities.has_background:
+                if pixel.background == CONTEXT_COLORS:
+                    self.context.background = self.context.background_stack[-1]
+                else:
+                    self.context.background = pixel.background
 
-        self.context.color = self.context.color_stack.pop()
-        self.context.background = self.context.background_stack.pop()
+            if should_set:
+                self.set(target_pos)
+            else:
+                self.reset(target_pos)
 
 
 class HighResBase:
@@ -1,23 +1,118 @@
+import json
 import re
 import time
 import sys
+from itertools import islice
 from io import StringIO
 
-from terminedia.backend_common import BackendColorContextMixin, JournalingCommandsMixin
+from terminedia.backend_common import BackendColorContextMixin, JournalingCommandsMixin, color_key
 from terminedia.unicode import char_width
 from terminedia.unicode_transforms import translate_chars
-from terminedia.utils import V2, Color
-from terminedia.values import DEFAULT_BG, DEFAULT_FG, Effects, UNICODE_EFFECTS, ESC
+from terminedia.utils import V2, Color, DirtyRegion, Rect
+from terminedia.values import DEFAULT_BG, DEFAULT_FG, Effects, UNICODE_EFFECTS, ESC, TERMINAL_EFFECTS, TRANSPARENT, CONTINUATION
 
-full_body_template = """\
+document_template = """\
 <!DOCTYPE html>
 <head>
   <meta charset="utf-8">
 </head>
 <body>
-  <div style="font-family: monospace; width:{width}em; height: {height}em; background: {background}; position: relative; white-space: pre">
-     {content}
-  </div>
+<pre style="font-family: monospace; color: {foreground}; background: {background}; display: inline-block; margin: 0">
+{content}</pre>
+{style}
+</body>
+</html>
+"""
+
+
+viewer_template = """\
+<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <style id="terminedia-styles">
+    #terminedia {font-family: monospace; color: {foreground}; background: {background}; display: inline-block; margin: 0}
+  </style>
+</head>
+<body>
+<pre id="terminedia"></pre>
+<script>
+"use strict";
+const display = document.getElementById("terminedia");
+const sheet = document.getElementById("terminedia-styles").sheet;
+const rows = [];
+
+function escape(text) {
+  return text.replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;");
+}
+
+function span(name, text) {
+  return name ? `<span class="${name}">${escape(text)}</span>` : escape(text);
+}
+
+function resize(width, height) {
+  for (const row of rows) {
+    while (row.cells.length < width) { row.cells.push(" "); row.classes.push(null); }
+  }
+  while (rows.length < height) {
+    const element = document.createElement("div");
+    element.id = "row-" + rows.length;
+    display.appendChild(element);
+    rows.push({element: element, cells: Array(width).fill(" "), classes: Array(width).fill(null)});
+  }
+}
+
+function draw(row) {
+  let html = "", run = "", runClass = null;
+  row.cells.forEach((cell, x) => {
+    if (row.classes[x] !== runClass) {
+      html += span(runClass, run);
+      run = "";
+      runClass = row.classes[x];
+    }
+    run += cell;
+  });
+  row.element.innerHTML = html + span(runClass, run);
+}
+
+function applyPatch(patch) {
+  resize(...patch.size);
+  for (const [name, style] of Object.entries(patch.styles || {})) {
+    sheet.insertRule(`.${name} {${style}}`, sheet.cssRules.length);
+  }
+  const changed = new Set();
+  for (const [y, x0, x1, runs] of patch.rows) {
+    const row = rows[y];
+    let x = x0;
+    for (const [name, text] of runs) {
+      for (const cell of (typeof text === "string" ? Array.from(text) : text)) {
+        row.cells[x] = cell;
+        row.classes[x++] = name;
+      }
+    }
+    changed.add(row);
+  }
+  changed.forEach(draw);
+}
+
+async function follow(url) {
+  const response = await fetch(url);
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  for (;;) {
+    const {value, done} = await reader.read();
+    if (done) break;
+    const lines = (buffer + value).split("\\n");
+    buffer = lines.pop();
+    lines.filter(line => line).forEach(line => applyPatch(JSON.parse(line)));
+  }
+}
+
+window.terminediaApplyPatch = applyPatch;
+{frames}.forEach(applyPatch);
+const source = new URLSearchParams(location.search).get("src") || {source};
+if (source) follow(source);
+</script>
 </body>
 </html>
 """
@@ -29,12 +124,62 @@ close_tag = """</span\n>"""
 # Space normalizer
 D = lambda str: " ".join(str.split())
 
+_html_escapes = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+
+_text_decorations = (
+    (Effects.underline | Effects.double_underline, "underline"),
+    (Effects.overlined, "overline"),
+    (Effects.crossed_out, "line-through"),
+    (Effects.blink | Effects.fast_blink, "blink"),
+)
+
+
+def css_style(foreground, background, effects):
+    """CSS declarations rendering text with the given colors and effects
+
+    The default colors are left out, so that they are inherited from
+    the enclosing element, unless an effect needs their actual values.
+    """
+    if effects is TRANSPARENT:
+        effects = Effects.none
+    foreground = DEFAULT_FG if foreground is TRANSPARENT else foreground
+    background = DEFAULT_BG if background is TRANSPARENT else background
+    explicit_fg = foreground is not DEFAULT_FG
+    explicit_bg = background is not DEFAULT_BG
+    foreground = foreground if isinstance(foreground, Color) else Color(foreground)
+    background = background if isinstance(background, Color) else Color(background)
+    color, bg_color = foreground.html, background.html
+    if effects & Effects.faint:
+        color = "rgba({}, {}, {}, 0.5)".format(*foreground.components)
+        explicit_fg = True
+    if effects & Effects.reverse:
+        color, bg_color = bg_color, color
+        explicit_fg = explicit_bg = True
+    if effects & Effects.conceal:
+        color = bg_color
+        explicit_fg = True
+    declarations = []
+    if explicit_fg:
+        declarations.append(f"color: {color}")
+    if explicit_bg:
+        declarations.append(f"background: {bg_color}")
+    if effects & Effects.bold:
+        declarations.append("font-weight: bold")
+    if effects & Effects.italic:
+        declarations.append("font-style: italic")
+    decorations = [name for flags, name in _text_decorations if effects & flags]
+    if decorations:
+        declarations.append("text-decoration: " + " ".join(decorations))
+    if effects & Effects.double_underline:
+        declarations.append("text-decoration-style: double")
+    return "; ".join(declarations)
+
 
 class HTMLCommands(BackendColorContextMixin):
     """Backend for generating HTML monospace content with character rendition for a terminedia image.
 
 
-    Used indirectlly by Shape.render when the selected render backend is HTML. It is interesting
+    Used indirectly by Screen when the selected backend is HTML. It is interesting
     to note that unlike the terminal "ANSI" backend, the output stream is only touched
     by the "._print" method - the "file" parameter is ignored in other methods
     that just update the internal state of the instance so that the next character
@@ -57,6 +202,10 @@ class HTMLCommands(BackendColorContextMixin):
 
         self.tag_is_open = False
 
+        #: Interns the CSS classes used in the frames written by ``fast_render``
+        self.patch_encoder = HTMLEncoder()
+        self.sent_styles = 0
+
     @property
     def dirty(self):
         return (
@@ -92,54 +241,12 @@ class HTMLCommands(BackendColorContextMixin):
             if self.tag_is_open:
                 file.write(close_tag)
             self.update_state()
-            color = self.current_foreground.html
-            background = self.current_background.html
-            if self.next_effects & Effects.faint:
-                color = f"rgba{color.components + (.5,)!r}"
-            if self.next_effects & Effects.reverse:
-                color, background = background, color
-            if self.next_effects & Effects.conceal:
-                color = background
             tag_attrs = f"""\
                 position: absolute;
                 left: {self.next_pos.x}ch;
                 top: {self.next_pos.y}em;
-                color: {color};
-                background: {background};
+                {css_style(self.current_foreground, self.current_background, self.next_effects)};
             """
-            tag_attrs += (
-                (
-                    "text-decoration: "
-                    + (
-                        "underline"
-                        if self.next_effects
-                        & (Effects.underline | Effects.double_underline)
-                        else ""
-                    )
-                    + ("double" if self.next_effects & Effects.double_underline else "")
-                    + ("overline" if self.next_effects & Effects.overlined else "")
-                    + (
-                        "line-through"
-                        if self.next_effects & Effects.crossed_out
-                        else ""
-                    )
-                    + (
-                        "blink"
-                        if self.next_effects & (Effects.blink | Effects.fast_blink)
-                        else ""
-                    )
-                )
-                if self.next_effects
-                & (
-                    Effects.underline
-                    | Effects.overlined
-                    | Effects.crossed_out
-                    | Effects.double_underline
-                    | Effects.blink
-                    | Effects.fast_blink
-                )
-                else ""
-            )
             tag = open_tag.format(style=D(tag_attrs))
             file.write(tag + content)
             self.tag_is_open = True
@@ -181,6 +288,59 @@ class HTMLCommands(BackendColorContextMixin):
     def clear(self):
         pass
 
+    def fast_render(self, data, rects=None, file=None):
+        """Writes the contents of the given areas as a JSON patch frame
+
+        Args:
+          - data (Shape): contents to be displayed
+          - rects (Optional[Iterable[Rect]]): areas to render. Defaults to the whole shape.
+          - file (Optional[TextIO]): output stream. Defaults to sys.stdout
+
+        Each call writes one line of JSON, with the keys:
+          - "size": [width, height] of the shape
+          - "styles": CSS declarations for the classes not sent in earlier frames
+          - "rows": a list of [row, start column, end column, runs] items,
+              where each run is a [class name or null, text] pair. The text
+              has one character per column - or is a list with the text
+              of each column, if any column does not hold exactly one character.
+
+        The page created by :any:`patch_viewer` applies these frames
+        to a ``<pre>`` element with one ``<div>`` per row. While a Screen
+        renders in this mode, direct writes to it only change ``Screen.data``,
+        and are sent with the next ``Screen.update``.
+        """
+        if file is None:
+            file = sys.stdout
+        width, height = data.size
+        if rects is None:
+            rects = [Rect((0, 0), data.size)]
+        elif len(rects) > 1:
+            # Merge possibly overlapping areas, so that no cell is sent twice
+            region = DirtyRegion(data.size, tile_size=1)
+            for rect in rects:
+                region.mark_rect(rect)
+            rects = region.rects()
+        encoder = self.patch_encoder
+        rows = []
+        for rect in rects:
+            if not isinstance(rect, Rect):
+                rect = Rect(rect)
+            x0, x1 = max(0, rect.left), min(rect.right, width)
+            if x0 >= x1:
+                continue
+            for y in range(max(0, rect.top), min(rect.bottom, height)):
+                runs = [
+                    [class_, "".join(cells) if all(len(cell) == 1 for cell in cells) else cells]
+                    for class_, cells in encoder.row_runs(*data.get_row(y, x0, x1))
+                ]
+                rows.append([y, x0, x1, runs])
+        patch = {"size": [width, height], "rows": rows}
+        if len(encoder.styles) > self.sent_styles:
+            patch["styles"] = dict(islice(encoder.styles.items(), self.sent_styles, None))
+            self.sent_styles = len(encoder.styles)
+        file.write(json.dumps(patch, ensure_ascii=False, separators=(",", ":")) + "\n")
+        file.flush()
+
 
 class JournalingHTMLCommands(JournalingCommandsMixin, HTMLCommands):
     def replay(self, file=None, single_write=False):
@@ -193,3 +353,133 @@ class JournalingHTMLCommands(JournalingCommandsMixin, HTMLCommands):
         (It does not make sense to pass this as True from here)
         """
         super().replay(file=file, single_write=False)
+
+
+class HTMLEncoder:
+    """Encodes shape contents as compact HTML
+
+    Each distinct combination of foreground, background and effects
+    is interned as a generated CSS class, and each row of the shape is output
+    as one line of a ``<pre>`` element, where consecutive characters sharing
+    a class are merged in a single ``<span>``. Characters with the default
+    colors and no effects are output without any tag.
+
+    Args:
+      - class_prefix (str): prefix for the generated CSS class names
+
+    Used by Shape.render when the selected render backend is HTML.
+    """
+
+    def __init__(self, class_prefix="tm"):
+        self.class_prefix = class_prefix
+        self.classes = {}
+        #: CSS declarations for each generated class name
+        self.styles = {}
+
+    def class_for(self, foreground, background, effects):
+        """Name of the CSS class for a combination of colors and effects
+
+        Returns None if no styling is needed.
+        """
+        # Unicode effects are applied to the characters themselves
+        effects_key = int(effects & TERMINAL_EFFECTS) if effects is not TRANSPARENT else 0
+        key = (color_key(foreground), color_key(background), effects_key)
+        try:
+            return self.classes[key]
+        except KeyError:
+            pass
+        style = css_style(foreground, background, effects)
+        name = None
+        if style:
+            name = f"{self.class_prefix}{len(self.styles)}"
+            self.styles[name] = style
+        self.classes[key] = name
+        return name
+
+    def row_runs(self, chars, foregrounds, backgrounds, effects):
+        """Groups the cells of a row in runs sharing a CSS class
+
+        Takes the channel lists returned by ``Shape.get_row``, and returns
+        a list of (class name, cells) pairs, with one text item in "cells"
+        for each column. Columns covered by double width characters hold
+        an empty string.
+        """
+        runs = []
+        run = None
+        run_class = None
+        for char, fg, bg, effect in zip(chars, foregrounds, backgrounds, effects):
+            if char is CONTINUATION:
+                if run is None:
+                    run = []
+                    runs.append((run_class, run))
+                run.append("")
+                continue
+            if char is TRANSPARENT:
+                char = " "
+            elif effect is not TRANSPARENT and effect & UNICODE_EFFECTS:
+                char = translate_chars(char, effect & UNICODE_EFFECTS)
+            class_ = self.class_for(fg, bg, effect)
+            if run is None or class_ != run_class:
+                run = []
+                run_class = class_
+                runs.append((run_class, run))
+            run.append(char)
+        return runs
+
+    def encode_row(self, chars, foregrounds, backgrounds, effects):
+        """Encodes one row, given as the channel lists returned by ``Shape.get_row``"""
+        return "".join(
+            self._span(class_, cells)
+            for class_, cells in self.row_runs(chars, foregrounds, backgrounds, effects)
+        )
+
+    @staticmethod
+    def _span(class_, chars):
+        text = "".join(chars).translate(_html_escapes)
+        return f'<span class="{class_}">{text}</span>' if class_ else text
+
+    def stylesheet(self):
+        """A ``<style>`` element with the classes used so far"""
+        rules = "".join(f".{name} {{{style}}}\n" for name, style in self.styles.items())
+        return f"<style>\n{rules}</style>"
+
+    def render(self, data, file=None):
+        """Writes the contents of a shape as a full HTML document
+
+        Args:
+          - data (Shape): contents to render
+          - file (Optional[TextIO]): output stream. Defaults to sys.stdout
+
+        Each row is written as soon as it is encoded. The stylesheet comes
+        after the contents, since the classes are only known at the end.
+        """
+        if file is None:
+            file = sys.stdout
+        preamble, post_amble = document_template.split("{content}")
+        file.write(preamble.format(foreground=DEFAULT_FG.html, background=DEFAULT_BG.html))
+        for y in range(data.height):
+            file.write(self.encode_row(*data.get_row(y)) + "\n")
+        file.write(post_amble.format(style=self.stylesheet()))
+
+
+def patch_viewer(source=None, frames=()):
+    """Static HTML page displaying the patch frames written by ``HTMLCommands.fast_render``
+
+    Args:
+      - source (Optional[str]): URL of a stream of frames, one per line, which
+          is followed as it grows. Can also be given as the "src" query parameter of the page.
+      - frames (Iterable[Union[str, dict]]): frames embedded in the page, applied on loading.
+          Useful to open a recording as a local file, where fetching a stream is not possible.
+
+    Other transports can feed frames to the page with the
+    ``terminediaApplyPatch`` javascript function.
+    """
+    frames = [json.loads(frame) if isinstance(frame, str) else frame for frame in frames]
+    script_json = lambda value: json.dumps(value, ensure_ascii=False).replace("</", "<\\/")
+    return (
+        viewer_template
+        .replace("{foreground}", DEFAULT_FG.html)
+        .replace("{background}", DEFAULT_BG.html)
+        .replace("{frames}", script_json(frames))
+        .replace("{source}", script_json(source))
+    )
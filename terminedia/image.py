@@ -1,4 +1,3 @@
-import heapq
 import logging
 import math
 import sys
@@ -6,15 +5,15 @@ from abc import ABC, abstractmethod
 from collections import namedtuple
 from collections.abc import Sequence
 from inspect import signature
-from io import StringIO
+from io import BufferedIOBase, RawIOBase, StringIO
 from pathlib import Path
-from weakref import ref, ReferenceType
 
 from terminedia.contexts import Context
 from terminedia.sprites import SpriteContainer
 from terminedia.subpixels import BrailleChars, HalfChars, SextantChars
 from terminedia.unicode import char_width
-from terminedia.utils import Color, Rect, V2, LazyBindProperty, get_current_tick, size_in_blocks
+from terminedia.utils import Color, DirtyRegion, Rect, V2, LazyBindProperty, get_current_tick, size_in_blocks
+from terminedia.utils import PackedCharPlane, PackedColorPlane, InternedPlane
 from terminedia.unicode_transforms import translate_chars
 from terminedia.values import (
     DEFAULT_FG,
@@ -227,6 +226,7 @@ class ShapeApiMixin:
             reset_fn=lambda pos: type(self).__setitem__(self, pos, EMPTY),
             size_fn=self.get_size,
             context=self.context,
+            target=self,
         )
 
     def _get_highres(self, **kw):
@@ -276,91 +276,26 @@ class ShapeApiMixin:
 #
 ####################
 
-DirtyNode = namedtuple("DirtyNode", "tick untie rect source")
-
-_none_ref = lambda : None
-
-def _ensure_ref(obj):
-    if isinstance(obj, ReferenceType):
-        return obj
-    if obj is None:
-        return _none_ref
-    if hasattr(obj.__class__, "__weakref__"):
-        return ref(obj)
-    return lambda: obj
-
-class OrderedRegistry:
-    # TODO: maybe use a linked list
-
-    def __init__(self):
-        self.untie = 0
-        self.reset()
-
-    def reset(self):
-        self.data = []
-        self.sources = {}
-        self.rects = set()
-
-    def push(self, node):
-        if len(node) == 3:
-            node = DirtyNode(node[0], self.untie, node[1], _ensure_ref(node[2]))
-        else:
-            node = DirtyNode(node[0], self.untie, node[2],  _ensure_ref(node[3]))
-        self.untie += 1
-
-        t = node.rect.as_tuple
-        self.sources.setdefault(t, []).append(node)
-        self.rects.add(t)
-        heapq.heappush(self.data, node)
-
-    def reset_to(self, node):
-        self.reset()
-        self.push(node)
-
-    #def clear_left(self, threshold):
-        #if not self.data:
-            #return
-        #counter = 0
-        #for node in self.data:
-            #if node.tick <= threshold:
-                #counter += 1
-                #t = node.rect.as_tuple
-                #if t in self.sources:
-                    #for node2 in self.sources[t]:
-                        #source = node2.source()
-                        #if hasattr(source, "dirty_clear"):
-                            #source.dirty_clear(threshold)
-                    #del self.sources[t]
-
-            #else:
-                #break
-        #self.data[:counter] = []
-
-    def __iter__(self):
-        return iter(self.data)
-
-    def __repr__(self):
-        return f"Registry <{self.data}>"
-
-
-
 DIRTY_TILE_SIZE = 8
 
 class ShapeDirtyMixin:
+    #: Side of the square tiles in which changes are tracked. Smaller values
+    #: yield more precise areas to re-render, at the cost of more bookkeeping.
+    dirty_tile_size = DIRTY_TILE_SIZE
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.dirty_registry = OrderedRegistry()
+        self.dirty_region = DirtyRegion(self.size, self.dirty_tile_size)
+        self.dirty_last_clear = None
         # Mark all shape as dirty:
         self.dirty_set()
-        # collection of all changed pixels:
-        self.dirty_pixels = set()
         self.dirty_saved_sprite_rects = set()
         self.dirty_sprite_rects_saved_at = 0
 
     def dirty_clear(self, threshold=None):
         tick = threshold if threshold is not None else get_current_tick()
         self.dirty_last_clear = tick
-        self.dirty_registry.reset()  # clear_left(tick)
+        self.dirty_region.clear()
 
         self.dirty_save_current_sprite_rects(tick)
 
@@ -374,23 +309,23 @@ class ShapeDirtyMixin:
                 self.dirty_saved_sprite_rects.update(sprite.dirty_rects)
 
     def dirty_set(self, rect=None):
-        tick = get_current_tick()
         if rect is None:
-            rect = Rect((0, 0), self.size)
+            self.dirty_region.set_all()
         else:
-            rect = Rect(rect) if not isinstance(rect, Rect) else rect
-        self.dirty_registry.reset_to((tick, rect, None))
+            self.dirty_region.mark_rect(rect)
 
     def dirty_update(self):
 
+        # Time-dependant transformers can change their output from one frame
+        # to the next: mark the area they affect (by default, all the shape)
+        # as dirty, if a new period for them started since the last clear.
         tick = get_current_tick()
-
-        # If there is any time-dependant image change, there is no way
-        # to predict what changes from one frame to the next - just mark
-        # all shape as dirty.
-        if any("tick" in transformer.signatures for transformer in self.context.transformers):
-            self.dirty_set()
-            return
+        for transformer in self.context.transformers:
+            if transformer.tick_changed(self.dirty_last_clear, tick):
+                if transformer.rect is None:
+                    self.dirty_set()
+                    return
+                self.dirty_region.mark_rect(transformer.rect)
 
         # Collect rects from sprites
         if self.has_sprites:
@@ -399,30 +334,20 @@ class ShapeDirtyMixin:
                     continue
 
                 for rect in sprite.dirty_rects:
-                    self.dirty_registry.push((tick, sprite.owner_coords(rect), sprite.shape))
-
-        # mark dirty pixels
-
-        tile_size = (DIRTY_TILE_SIZE, DIRTY_TILE_SIZE)
-        self_rect = Rect((0, 0), self.size)
-        for tile in self.dirty_pixels:
-            rect = Rect(tile * DIRTY_TILE_SIZE, width_height=tile_size)
-            rect = rect.intersection(self_rect)
-            if not rect:
-                continue
-            self.dirty_registry.push((tick, rect, None))
-        self.dirty_pixels = set()
+                    self.dirty_region.mark_rect(sprite.owner_coords(rect))
 
     def dirty_mark_pixel(self, index):
-        self.dirty_pixels.add(index // DIRTY_TILE_SIZE)
+        self.dirty_region.mark_pixel(index)
+
+    def dirty_mark_span(self, y, x0, x1):
+        """Marks the tiles touched by a horizontal span of pixels as dirty, at once"""
+        self.dirty_region.mark_span(y, x0, x1)
 
     @property
     def dirty_rects(self):
         self.dirty_update()
-        # on purpose eager approach - the registry might be updated while rendering is taking place
-        return self.dirty_registry.rects.copy()
-
-        # return [node.rect for node in self.dirty_registry if self.dirty_registry.sources[node.rect.as_tuple][0].untie == node.untie]
+        # on purpose eager approach - the region might be updated while rendering is taking place
+        return {rect.as_tuple for rect in self.dirty_region.rects()}
 
 ##############
 #
@@ -554,6 +479,53 @@ class Shape(ABC, ShapeApiMixin, ShapeDirtyMixin):
                     yield None
                     break
 
+    def _clip_span(self, x0, x1):
+        x0 = max(0, x0)
+        x1 = self.width if x1 is None else min(x1, self.width)
+        return x0, max(x0, x1)
+
+    def get_row(self, y, x0=0, x1=None):
+        """Reads a horizontal span of pixels at once
+
+        Args:
+          - y (int): row to read
+          - x0 (int): first column in the span
+          - x1 (Optional[int]): column after the end of the span. Defaults to the shape width.
+
+        Returns a tuple with one list for each pixel channel, in the same
+        order as the fields in ``self.PixelCls`` - e.g. for a FullShape:
+        ``(values, foregrounds, backgrounds, effects)``.
+        The span is clipped to the shape limits.
+
+        This is the preferred way to read contents that will be
+        processed in bulk, as subclasses can retrieve the data
+        without building a Pixel object for each position.
+        """
+        x0, x1 = self._clip_span(x0, x1)
+        channels = tuple([] for _ in self.PixelCls._fields)
+        if not 0 <= y < self.height:
+            return channels
+        for x in range(x0, x1):
+            pixel = self[x, y]
+            channels[0].append(pixel.value)
+            for channel, component in zip(channels[1:], pixel[1:]):
+                channel.append(component)
+        return channels
+
+    def get_region(self, rect):
+        """Reads the contents of a rectangular area
+
+        Args:
+          - rect (Rect): area to read. It is clipped to the shape limits.
+
+        Returns a list with one item for each row in the area, as returned by :any:`Shape.get_row`
+        """
+        rect = Rect(rect)
+        return [
+            self.get_row(y, rect.left, rect.right)
+            for y in range(max(0, rect.top), min(rect.bottom, self.height))
+        ]
+
     def concat(self, *others, direction=Directions.RIGHT, **kwargs):
         """Concatenates two given shapes side by side into a larger shape.
 
@@ -614,6 +586,7 @@ class Shape(ABC, ShapeApiMixin, ShapeDirtyMixin):
 
             If output is given, it should be a file-like object to which the contents
             of the shape will be written. Binary backends require a binary file. thenmethod returns None.
+            Text backends may also be given a binary file: the output is then UTF-8 encoded.
             If no output is given, the rendered contents are returned.
         """
         backend = backend.upper()
@@ -628,30 +601,24 @@ class Shape(ABC, ShapeApiMixin, ShapeDirtyMixin):
         if backend == "ANSI":
             return self._render_using_screen(output, backend)
         if backend == "HTML":
-            # FIXME: this somewhat violates some "this module should not know about
-            # specific backend stuff (HTML template)."
-            # However, the rendering machinnery only knows
-            # about incremental rendering, and can't "sandwhich"
-            # the final rendering. In any case, the outter HTML template
-            # should be configurable in a near term future.
-            from terminedia.html import full_body_template
-
-            preamble, post_amble = full_body_template.split("{content}")
-            output.write(preamble)
-            self._render_using_screen(output, backend)
-            output.write(post_amble)
+            from terminedia.html import HTMLEncoder
+
+            # The encoder reads all four channels: other shapes are
+            # drawn on a FullShape, as they would be on a Screen
+            data = self if len(self.PixelCls._fields) == 4 else FullShape.promote(self)
+            HTMLEncoder().render(data, output)
         else:
             raise ValueError(f"Output type {backend!r} not implemented")
         if not original_output:
-            return output.get_value()
+            return output.getvalue()
 
     def _render_using_screen(self, output, backend):
         from terminedia.screen import Screen
+        from terminedia.terminal import ByteSink
 
-        if output is None:
-            file = StringIO()
-        else:
-            file = output
+        binary = isinstance(output, (RawIOBase, BufferedIOBase)) or "b" in getattr(output, "mode", "")
+        if binary:
+            output = ByteSink(output)
         sc = Screen(size=V2(self.width, self.height), backend=backend)
         if backend=="ANSI":
             # generate a relocatable image
@@ -665,6 +632,8 @@ class Shape(ABC, ShapeApiMixin, ShapeDirtyMixin):
         sc.commands.stop_journal()
         # Renders all graphic ops as ANSI sequences + unicode into file:
         sc.commands.replay(output)
+        if binary:
+            output.flush()
 
     def __repr__(self):
         cap = self.PixelCls.capabilities
@@ -725,6 +694,15 @@ class ShapeView(ShapeApiMixin):
 
     __iter__ = Shape.__iter__
 
+    def get_row(self, y, x0=0, x1=None):
+        roi = self.roi
+        x1 = roi.width if x1 is None else min(x1, roi.width)
+        if not 0 <= y < roi.height:
+            return self.original.get_row(-1, 0, 0)
+        return self.original.get_row(roi.top + y, roi.left + max(0, x0), roi.left + x1)
+
+    get_region = Shape.get_region
+
     def __getattribute__(self, attr):
         # Attributes not proxied in ShapeView
         if attr in {
@@ -743,6 +721,8 @@ class ShapeView(ShapeApiMixin):
             "_get_drawing",
             "_get_highres",
             "_get_text",
+            "get_row",
+            "get_region",
         }:
             return super().__getattribute__(attr)
         return getattr(self.original, attr)
@@ -1037,6 +1017,11 @@ class FullShape(Shape):
             data: a unicode sequence representing a single glyph. The second
             and 3rd should contain color values, and the 4th an integer
             representing text effects according to Effects values.
+      - storage (str): Storage engine for the planes. "list" (default) uses
+            plain Python lists holding one object per cell. "packed" uses
+            array-backed planes: code points for characters, 32bit integers
+            for colors and a byte-sized index for effects, taking a fraction
+            of the memory. (e.g.: ``FullShape.new((300, 100), storage="packed")``)
     """
 
     PixelCls = pixel_factory(
@@ -1056,11 +1041,20 @@ class FullShape(Shape):
             [Effects.none] * size.x * size.y,
         ]
 
-    def __init__(self, data):
+    storage_engines = {
+        "list": (None, None, None, None),
+        "packed": (PackedCharPlane, PackedColorPlane, PackedColorPlane, InternedPlane),
+    }
+
+    def __init__(self, data, storage="list"):
+        if storage not in self.storage_engines:
+            raise ValueError(f"Unknown storage engine: {storage!r}")
+        self.storage = storage
         self.width = w = len(data[0][0])
         self.height = h = len(data[0])
         self.value_data, self.fg_data, self.bg_data, self.eff_data = (
-            self.load_data(plane, (w, h)) for plane in data
+            plane_cls(self.load_data(plane, (w, h))) if plane_cls else self.load_data(plane, (w, h))
+            for plane, plane_cls in zip(data, self.storage_engines[storage])
         )
         # self.data is created as a side-effect in load_data
         del self.data
@@ -1092,6 +1086,27 @@ class FullShape(Shape):
             pixel = self.sprites.get_at(pos, pixel)
         return pixel
 
+    def get_row(self, y, x0=0, x1=None):
+        """Reads a horizontal span of pixels at once
+
+        Data is sliced directly from the storage planes, and transformers
+        and sprites are applied over the whole span.
+        See :any:`Shape.get_row`
+        """
+        x0, x1 = self._clip_span(x0, x1)
+        if not 0 <= y < self.height:
+            return ([], [], [], [])
+        start = y * self.width
+        row = [
+            plane[start + x0: start + x1]
+            for plane in (self.value_data, self.fg_data, self.bg_data, self.eff_data)
+        ]
+        if self.context.transformers:
+            row = self.context.transformers.process_row(self, V2(x0, y), row)
+        if self.has_sprites:
+            row = self.sprites.get_row(y, x0, x1, row)
+        return tuple(row)
+
     def __setitem__(self, pos, value):
         """
         Values set for each pixel are: character - only spaces (0x20) or "non-spaces" are
@@ -1187,6 +1202,82 @@ class FullShape(Shape):
                 )
         # set information so higher level users can partake char width (text, blit)
 
+    def _fast_blit(self, pos, source, extent=None, erase=False, blit_pixel=None):
+        """Copies contents of another FullShape by row slices, if possible
+
+        Called by ``Drawing.blit`` - returns False, without touching anything,
+        if the copy has to be made pixel by pixel: when the source is not
+        a FullShape (or a view on one), has transformers or sprites,
+        or this shape has pretransformers.
+        Rows that contain values with special treatment on pixel setting
+        (CONTEXT_COLORS, unicode effects, double width characters) are still
+        copied pixel by pixel, using the ``blit_pixel`` callback.
+        """
+        roi_offset = V2(0, 0)
+        width, height = source.width, source.height
+        if isinstance(source, ShapeView):
+            roi_offset = source.roi.c1
+            source = source.original
+        if (
+            not isinstance(source, FullShape)
+            or source is self
+            or source.context.transformers
+            or source.has_sprites and any(sprite.active for sprite in source.sprites)
+            or self.context.pretransformers
+        ):
+            return False
+
+        force_transparent_ink = getattr(self.context, "force_transparent_ink", False)
+        if extent:
+            width = min(width, extent.x - pos.x)
+            height = min(height, extent.y - pos.y)
+        # Clip to the target limits:
+        x0 = max(0, -pos.x)
+        x1 = min(width, self.width - pos.x)
+        y0 = max(0, -pos.y)
+        y1 = min(height, self.height - pos.y)
+        if x0 >= x1:
+            return True
+
+        planes = (self.value_data, self.fg_data, self.bg_data, self.eff_data)
+        for y in range(y0, y1):
+            row = source.get_row(roi_offset.y + y, roi_offset.x + x0, roi_offset.x + x1)
+            target_y = pos.y + y
+            target_x0 = pos.x + x0
+            chars, fgs, bgs, effects = row
+            if (
+                any(color is CONTEXT_COLORS for color in fgs)
+                or any(color is CONTEXT_COLORS for color in bgs)
+                or any(eff is not TRANSPARENT and eff & UNICODE_EFFECTS for eff in effects)
+                or any(
+                    isinstance(char, str) and (
+                        char == CONTINUATION or char >= "\u1100" and char_width(char) == 2
+                    ) for char in chars
+                )
+            ):
+                for x, values in enumerate(zip(*row), target_x0):
+                    should_set = values[0] != EMPTY
+                    if should_set or erase:
+                        blit_pixel(V2(x, target_y), self.PixelCls(*values), should_set)
+                continue
+
+            start = target_y * self.width + target_x0
+            should_set = [char != EMPTY or erase for char in chars]
+            for plane, channel in zip(planes, row):
+                mask = should_set if force_transparent_ink else [
+                    setting and value is not TRANSPARENT for setting, value in zip(should_set, channel)
+                ]
+                # Copy each run of positions that should be written in a single slice operation:
+                run_start = None
+                for i, setting in enumerate(mask + [False]):
+                    if setting and run_start is None:
+                        run_start = i
+                    elif not setting and run_start is not None:
+                        plane[start + run_start: start + i] = channel[run_start: i]
+                        run_start = None
+            self.dirty_mark_span(target_y, target_x0, target_x0 + len(chars))
+        return True
+
     @classmethod
     def promote(cls, other_shape, resolution=None):
         """Makes a FullShape copy of the other shape
@@ -1,8 +1,11 @@
 """non-blocking Keyboard reading and other input related code
 """
+import asyncio
+import codecs
 import os
 import sys
 import time
+import weakref
 
 from collections import defaultdict, namedtuple
 from contextlib import contextmanager
@@ -10,6 +13,16 @@ from contextlib import contextmanager
 from terminedia.utils import mirror_dict
 
 
+#: Objects holding deferred output, which is flushed before the keyboard is read
+#: (e.g. a :any:`Screen` created with the ``batch_interval`` option)
+pending_output = weakref.WeakSet()
+
+
+def _flush_pending_output():
+    for item in list(pending_output):
+        item.flush()
+
+
 # Keyboard reading code copied and evolved from
 # https://stackoverflow.com/a/6599441/108205
 # (@mheyman, Mar, 2011)
@@ -89,6 +102,8 @@ def _posix_inkey(break_=True, clear=True):
     simultaneous key-presses.
 
     """
+    if pending_output:
+        _flush_pending_output()
     keycode = ""
 
     if clear:
@@ -113,6 +128,135 @@ def _posix_inkey(break_=True, clear=True):
     return keycode
 
 
+def _split_keys(text, break_=True):
+    """Splits text read at once from stdin in a list of keycodes
+
+    Args:
+      - text (str): characters read
+      - break\\_ (bool): whether "CTRL + C" should raise KeyboardInterrupt.
+
+    Escape sequences are kept together, as a single keycode.
+    """
+    keys = []
+    keycode = ""
+    for c in text:
+        if c == "\x03" and break_:
+            raise KeyboardInterrupt
+        if keycode and c == "\x1b":
+            keys.append(keycode)
+            keycode = ""
+        keycode += c
+        if keycode == "\x1b":
+            continue
+        if (
+            len(keycode) == 1 or keycode in KeyCodes.codes
+            # ESC followed by another key than "[" or "O" is an "Alt + key" keycode
+            or len(keycode) == 2 and c not in "[O"
+            # Unknown sequences end with a letter or "~"
+            or len(keycode) > 2 and (c.isalpha() or c == "~")
+        ):
+            keys.append(keycode)
+            keycode = ""
+    if keycode:
+        keys.append(keycode)
+    return keys
+
+
+class AsyncKeyboard:
+    """Asynchronous keyboard reader, for use with asyncio
+
+    Args:
+      - break\\_ (bool): whether "CTRL + C" should raise KeyboardInterrupt.
+        Defaults to True.
+
+    Used as an async context manager, sets the terminal in the same mode as
+    :any:`keyboard`, and registers stdin with the running event loop:
+    keys are decoded as they arrive and put in a queue. They can be
+    consumed with ``await reader.get()`` or ``async for key in reader:`` -
+    which ends if the input is closed.
+
+    (Currently Posix only)
+    """
+
+    def __init__(self, break_=True):
+        self.break_ = break_
+        self.queue = None
+        #: Set when the input reached its end
+        self.closed = False
+
+    async def __aenter__(self):
+        self._keyboard = keyboard()
+        self._keyboard.__enter__()
+        self._attach(sys.stdin.fileno(), sys.stdin.encoding)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.loop.remove_reader(self.fd)
+        self._keyboard.__exit__(exc_type, exc_value, traceback)
+
+    def _attach(self, fd, encoding=None):
+        self.queue = asyncio.Queue()
+        self.loop = asyncio.get_running_loop()
+        self.fd = fd
+        self.decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+        self.loop.add_reader(self.fd, self._read)
+
+    def _read(self):
+        try:
+            data = os.read(self.fd, 1024)
+        except BlockingIOError:
+            return
+        if not data:
+            # End of input: the descriptor would be reported as readable forever
+            self.loop.remove_reader(self.fd)
+            self.feed(self.decoder.decode(b"", final=True))
+            self.closed = True
+            self.queue.put_nowait(None)
+            return
+        self.feed(self.decoder.decode(data))
+
+    def feed(self, text):
+        """Splits text read from the terminal in keycodes, and queues those"""
+        for key in _split_keys(text, self.break_):
+            self.queue.put_nowait(key)
+
+    async def get(self) -> str:
+        """Waits for and returns the next key pressed
+
+        Raises EOFError if the input ended.
+        """
+        if pending_output:
+            _flush_pending_output()
+        key = await self.queue.get()
+        if key is None:
+            # Keep the end marker for any other consumer
+            self.queue.put_nowait(None)
+            raise EOFError("End of keyboard input")
+        return key
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.get()
+        except EOFError:
+            raise StopAsyncIteration
+
+
+async def agetch(timeout=0) -> str:
+    """Asynchronous version of :any:`getch`
+    Args:
+      - timeout (float): time in seconds to wait. If 0 (default), waits forever
+
+    """
+    async with AsyncKeyboard() as reader:
+        try:
+            return await asyncio.wait_for(reader.get(), timeout or None)
+        except (asyncio.TimeoutError, EOFError):
+            return ""
+
+
 def getch(timeout=0) -> str:
     """Enters non-blocking keyboard mode and returns the first keypressed
     Args:
@@ -233,6 +377,8 @@ def _win32_inkey(break_=True, clear=True):
 
     """
 
+    if pending_output:
+        _flush_pending_output()
     if not msvcrt.kbhit():
         return ""
     
@@ -0,0 +1,238 @@
+"""Recording of screen updates over time, and their playback
+"""
+import json
+import struct
+import sys
+import time
+import zlib
+from bisect import bisect_right
+
+from terminedia.backend_common import FrameSnapshot, FrontBuffer, color_key
+from terminedia.terminal import ScreenCommands, write_all
+from terminedia.utils import Color, V2
+from terminedia.values import DEFAULT_BG, DEFAULT_FG, Effects, TRANSPARENT
+
+#: File signature, including the format version
+MAGIC = b"TMREC\x01"
+KEYFRAME = 1
+DELTA = 2
+
+_header = struct.Struct("<HH")
+_frame_header = struct.Struct("<BdI")
+_cell = struct.Struct("<HHIIIB")
+_TRANSPARENT_EFFECTS = 0xFFFFFFFF
+
+
+def _encode_cells(cells):
+    parts = []
+    for x, y, char, fg, bg, effects in cells:
+        char = char.encode("utf-8")
+        effects = _TRANSPARENT_EFFECTS if effects is TRANSPARENT else int(effects)
+        parts.append(_cell.pack(x, y, color_key(fg), color_key(bg), effects, len(char)))
+        parts.append(char)
+    return zlib.compress(b"".join(parts))
+
+
+def _decode_cells(payload):
+    data = zlib.decompress(payload)
+    cells = []
+    colors = {}
+    offset = 0
+    while offset < len(data):
+        x, y, fg, bg, effects, length = _cell.unpack_from(data, offset)
+        offset += _cell.size
+        char = data[offset: offset + length].decode("utf-8")
+        offset += length
+        for key in (fg, bg):
+            if key not in colors:
+                colors[key] = Color.from_packed(key)
+        effects = TRANSPARENT if effects == _TRANSPARENT_EFFECTS else Effects(effects)
+        cells.append((x, y, char, colors[fg], colors[bg], effects))
+    return cells
+
+
+class Recorder:
+    """Records the updates of a screen as timestamped deltas in a compact binary log
+
+    Args:
+      - file (Union[str, Path, BinaryIO]): path or binary file to write the log to
+      - size (2-sequence): size of the recorded screen
+      - keyframe_interval (float): seconds between full frames, so that
+            players can seek without going through the whole log.
+      - clock (callable): time source. Defaults to ``time.monotonic``
+
+    Set an instance as the ``recorder`` attribute of a :any:`Screen` to
+    record each ``Screen.update``, or call :any:`Recorder.record` directly.
+    Only the cells that changed since the previous frame are stored,
+    and each frame is zlib-compressed.
+    """
+
+    def __init__(self, file, size, keyframe_interval=10.0, clock=time.monotonic):
+        self.own_file = not hasattr(file, "write")
+        self.file = open(file, "wb") if self.own_file else file
+        self.size = V2(size)
+        self.keyframe_interval = keyframe_interval
+        self.clock = clock
+        self.front_buffer = FrontBuffer(self.size)
+        self.start = None
+        self.last_keyframe = None
+        self.file.write(MAGIC + _header.pack(*self.size))
+
+    def record(self, data, rects=None):
+        """Records the current contents of a shape as a frame
+
+        Args:
+          - data (Shape): contents being displayed (e.g. ``Screen.data``)
+          - rects (Optional[Iterable[Rect]]): areas that changed since the last frame.
+              Defaults to the whole shape.
+        """
+        now = self.clock()
+        if self.start is None:
+            self.start = now
+        timestamp = now - self.start
+        if self.last_keyframe is None or timestamp - self.last_keyframe >= self.keyframe_interval:
+            kind = KEYFRAME
+            self.last_keyframe = timestamp
+            self.front_buffer.invalidate()
+            rects = None
+        else:
+            kind = DELTA
+        cells = list(self.front_buffer.changed_cells(data, rects))
+        if not cells and kind == DELTA:
+            return
+        payload = _encode_cells(cells)
+        self.file.write(_frame_header.pack(kind, timestamp, len(payload)) + payload)
+
+    def close(self):
+        if self.own_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class Player:
+    """Plays back logs written by :any:`Recorder`
+
+    Args:
+      - file (Union[str, Path, BinaryIO]): path or binary file with the log
+
+    The log is indexed on load: seeking to any time starts from the
+    closest previous keyframe, and only the deltas after it are applied.
+    """
+
+    def __init__(self, file):
+        if hasattr(file, "read"):
+            data = file.read()
+        else:
+            with open(file, "rb") as f:
+                data = f.read()
+        if not data.startswith(MAGIC):
+            raise ValueError("Not a terminedia recording")
+        self.data = data
+        self.size = V2(_header.unpack_from(data, len(MAGIC)))
+        #: (timestamp, kind, payload offset, payload length) for each frame
+        self.index = []
+        offset = len(MAGIC) + _header.size
+        while offset < len(data):
+            kind, timestamp, length = _frame_header.unpack_from(data, offset)
+            offset += _frame_header.size
+            self.index.append((timestamp, kind, offset, length))
+            offset += length
+        self.timestamps = [entry[0] for entry in self.index]
+        self.keyframes = [i for i, entry in enumerate(self.index) if entry[1] == KEYFRAME]
+
+    @property
+    def duration(self):
+        return self.timestamps[-1] if self.index else 0.0
+
+    def _blank_frame(self):
+        width, height = self.size
+        return FrameSnapshot(self.size, {
+            y: ([" "] * width, [DEFAULT_FG] * width, [DEFAULT_BG] * width, [Effects.none] * width)
+            for y in range(height)
+        })
+
+    def _cells(self, i):
+        timestamp, kind, offset, length = self.index[i]
+        return _decode_cells(self.data[offset: offset + length])
+
+    @staticmethod
+    def _apply(frame, cells):
+        for x, y, *values in cells:
+            for channel, value in zip(frame.rows[y], values):
+                channel[x] = value
+
+    def seek(self, timestamp):
+        """Contents displayed at a given time, as a :any:`FrameSnapshot`
+
+        Returns a (frame, next_index) pair, where next_index is the position
+        in ``self.index`` of the first frame after the given time.
+        """
+        end = bisect_right(self.timestamps, timestamp)
+        start = bisect_right(self.keyframes, end - 1) - 1
+        first = self.keyframes[start] if start >= 0 else 0
+        frame = self._blank_frame()
+        for i in range(first, end):
+            self._apply(frame, self._cells(i))
+        return frame, end
+
+    def frames(self, start=0.0, end=None):
+        """Yields (timestamp, cells) pairs for each frame in an interval
+
+        The first item holds all the cells displayed at the start time,
+        and the others, the cells changed in each frame.
+        """
+        frame, i = self.seek(start)
+        width, height = self.size
+        yield start, [
+            (x, y, *cell)
+            for y in range(height) for x, cell in enumerate(zip(*frame.rows[y]))
+        ]
+        for i in range(i, len(self.index)):
+            timestamp = self.index[i][0]
+            if end is not None and timestamp > end:
+                break
+            yield timestamp, self._cells(i)
+
+    def _ansi_frames(self, start=0.0, end=None, commands=None):
+        commands = commands or ScreenCommands()
+        state = {"last_pos": None}
+        width = self.size[0]
+        for timestamp, cells in self.frames(start, end):
+            yield timestamp, commands.encode_cells(cells, state, width=width)
+
+    def play(self, speed=1.0, start=0.0, end=None, file=None):
+        """Plays the recording on the terminal
+
+        Args:
+          - speed (float): playback speed factor. If 0, frames are output as fast as possible.
+          - start, end (float): interval to play, in seconds from the start of the recording
+          - file (Optional[TextIO]): output stream. Defaults to sys.stdout
+        """
+        file = file or sys.stdout
+        began = time.monotonic()
+        for timestamp, text in self._ansi_frames(start, end):
+            if speed:
+                delay = (timestamp - start) / speed - (time.monotonic() - began)
+                if delay > 0:
+                    time.sleep(delay)
+            write_all(file, text)
+
+    def export_asciicast(self, output, start=0.0, end=None):
+        """Writes the recording as an asciicast (version 2) file
+
+        Args:
+          - output (Union[str, Path, TextIO]): path or text file
+          - start, end (float): interval to export, in seconds from the start of the recording
+        """
+        own_file = not hasattr(output, "write")
+        file = open(output, "wt", encoding="utf-8") if own_file else output
+        try:
+            header = {"version": 2, "width": self.size[0], "height": self.size[1]}
+            file.write(json.dumps(header) + "\n")
+            for timestamp, text in self._ansi_frames(start, end):
+                if text:
+                    file.write(json.dumps([round(timestamp - start, 6), "o", text]) + "\n")
+        finally:
+            if own_file:
+                file.close()
@@ -1,7 +1,9 @@
 import logging
 import os
+import sys
 import threading
 import time
+from io import StringIO
 from math import ceil
 
 import terminedia.text
@@ -19,8 +21,11 @@ from terminedia.values import (
     FULL_BLOCK,
     TRANSPARENT
 )
+from terminedia.backend_common import FrameSnapshot, FrontBuffer
+from terminedia.terminal import ByteSink, awrite_all
 from terminedia.drawing import Drawing, HighRes
 from terminedia.image import Pixel, FullShape
+from terminedia.input import pending_output
 
 logger = logging.getLogger(__name__)
 
@@ -54,6 +59,29 @@ class Screen:
         This does not resize the actual terminal - a smaller area is available to the methods instead.
         If given size is larger than the actual terminal, mayhen ensues.
       - clear_screen (bool): Whether to clear the terminal and hide cursor when entering the screen. Defaults to True.
+      - backend (str): "ansi" or "html". Defaults to "ansi".
+      - diff_render (bool): If True, a record of the cells displayed is kept, and ``Screen.update``
+        only issues the cells whose contents changed since the last time they were rendered.
+        Defaults to False.
+      - color_depth (int): Colors supported by the terminal: 24 for RGB colors, 8 for the
+        256 color palette or 4 for the 16 basic colors. Colors are mapped to the closest
+        palette entry on the lower depths. Used by the "ansi" backend. Defaults to 24.
+      - synchronized_update (bool): If True, the output of each ``Screen.update`` call is written
+        at once, enclosed in the "synchronized output" sequences (DEC private mode 2026),
+        so that supporting terminals display whole frames without tearing. Used by the "ansi"
+        backend. Defaults to False.
+      - render_thread (bool): If True, frames are rendered by a background thread: the
+        application draws on ``Screen.data`` and calls :any:`Screen.commit` when a
+        frame is ready, while the previous frame may still be being written. Implies
+        ``diff_render``. Defaults to False.
+      - bytes_output (bool): If True, the output is encoded and written straight to the
+        file descriptor for stdout by a :any:`ByteSink`, instead of going through ``sys.stdout``.
+        Used by the "ansi" backend. Defaults to False.
+      - batch_interval (Optional[float]): If given, writes made directly on the screen
+        (``screen[x, y] = ...``, ``screen.draw``, ``screen.print_at``, etc...) only change
+        ``Screen.data``, and the output is deferred: it is rendered at once, at most
+        this many seconds later, on the next ``Screen.update`` call or when the keyboard
+        is read - whichever comes first. If 0, no timer is used. Defaults to None (write at once).
 
     """
 
@@ -72,7 +100,9 @@ class Screen:
     #: Internal: tracks last used effects attribute to avoid mangling and enable optimizations
     last_effects = None
 
-    def __init__(self, size=(), clear_screen=True, backend="ansi"):
+    def __init__(self, size=(), clear_screen=True, backend="ansi", diff_render=False, color_depth=24,
+                 synchronized_update=False, render_thread=False, bytes_output=False,
+                 batch_interval=None):
         if not size:
             #: Set in runtime to a method to retrieve the screen width, height.
             #: The class is **not** aware of terminal resizings while running, though.
@@ -122,19 +152,49 @@ class Screen:
             from terminedia.html import JournalingHTMLCommands as CommandsClass
         else:
             raise ValueError(f"Unrecognized backend: {backend!r}.")
+        if color_depth not in (4, 8, 24):
+            raise ValueError(f"Color depth must be one of 4, 8 or 24, not {color_depth!r}.")
 
         #: Namespace for low-level rendering commands, an instance of :any:`JournalingCommandsMixin`.
         #: This attribute can be used as a context manager to group
         #: various output operations in a single block that is rendered at once.
         self.commands = CommandsClass()
+        self.commands.color_depth = color_depth
+        self.commands.synchronized_update = synchronized_update
+        if bytes_output:
+            self.commands.output = ByteSink()
         self.clear_screen = clear_screen
         self.data = FullShape.new((self.width, self.height))
         # Synchronize context for data and screen painting.
         self.data.context = self.context
+        #: Record of the displayed contents, used to render only changed cells
+        #: on update. Set if the ``diff_render`` argument is True.
+        self.front_buffer = FrontBuffer(self.size) if diff_render or render_thread else None
         from terminedia import context
         self.root_context = context
         self._last_setitem = 0
 
+        if render_thread and not hasattr(self.commands, "diff_render"):
+            raise ValueError(f"The {backend!r} backend does not support a render thread.")
+        #: Whether frames are rendered in a background thread (see :any:`Screen.commit`)
+        self.render_thread = render_thread
+        self._render_condition = threading.Condition()
+        self._render_pending = None
+        self._render_busy = False
+        self._render_stop = False
+        self._render_worker = None
+        self._render_error = None
+
+        #: Maximum delay, in seconds, for rendering deferred writes, or None if
+        #: writes are rendered at once. (See the ``batch_interval`` argument)
+        self.batch_interval = batch_interval
+        self._batch_lock = threading.RLock()
+        self._batch_pending = False
+        self._batch_timer = None
+
+        #: A :any:`Recorder` storing each update, or None.
+        self.recorder = None
+
     @LazyBindProperty(type=Context)
     def context(self):
         return Context()
@@ -155,6 +215,8 @@ class Screen:
                 #self.commands.clear()
                 #self.commands.moveto((0, 0))
                 pass
+        self.flush()
+        self.stop_render_thread()
         self.commands.cursor_show()
         self.commands.reset_colors()
 
@@ -177,6 +239,9 @@ class Screen:
         self.context.last_pos = V2(0, 0)
         self.__class__.last_color = None
         self.__class__.last_background = None
+        with self._batch_lock:
+            self._cancel_deferred_output()
+        self.wait_render()
         with self.lock:
             if wet_run:
                 self.commands.clear()
@@ -184,6 +249,8 @@ class Screen:
             else:
                 self.data.clear(transparent=True)
             self.data.dirty_set()
+            if self.front_buffer is not None:
+                self.front_buffer.invalidate()
             self.commands.cursor_hide()
 
     def set_at(self, pos, pixel=None):
@@ -307,6 +374,19 @@ class Screen:
         """
 
         cls = self.__class__
+        if self.batch_interval is not None and value is not _REPLAY:
+            with self._batch_lock:
+                self.data[pos] = value
+                self._defer_output()
+            return
+        if self.render_thread and value is not _REPLAY:
+            # Only the render thread writes to the output: the change is shown on the next commit
+            self.data[pos] = value
+            return
+        if self.backend == "HTML" and value is not _REPLAY and getattr(self.root_context, "fast_render", False):
+            # The output is a stream of JSON patch frames: the change is sent on the next update
+            self.data[pos] = value
+            return
         with self.lock:
             # Force underlying shape machinnery to apply context attributes and transformations:
             if value != _REPLAY:
@@ -333,19 +413,203 @@ class Screen:
             if pixel.value not in (CONTINUATION, TRANSPARENT):
                 self.commands.print_at(pos, pixel.value)
                 self.context.last_pos = V2(pos)
+                if self.front_buffer is not None:
+                    self.front_buffer.set_cell(pos, *pixel)
 
     def blit(self, position, shape, **kwargs):
         with self.commands:
             self.draw.blit(position, shape, **kwargs)
 
+    def _defer_output(self):
+        if self._batch_pending:
+            return
+        self._batch_pending = True
+        pending_output.add(self)
+        if self.batch_interval:
+            settings = {
+                "fast_render": getattr(self.root_context, "fast_render", False),
+                "interactive_mode": self.root_context.interactive_mode,
+            }
+            self._batch_timer = threading.Timer(self.batch_interval, self._timed_flush, kwargs=settings)
+            self._batch_timer.daemon = True
+            self._batch_timer.start()
+
+    def _cancel_deferred_output(self):
+        self._batch_pending = False
+        pending_output.discard(self)
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+
+    def _timed_flush(self, **settings):
+        # Root context attributes are thread-local: use the ones from the drawing thread
+        for name, value in settings.items():
+            setattr(self.root_context, name, value)
+        self.flush()
+
+    def flush(self):
+        """Renders writes deferred by the ``batch_interval`` option, if any"""
+        with self._batch_lock:
+            if self._batch_pending:
+                self.update()
+
     def update(self, pos1=None, pos2=None):
+        if self.batch_interval is not None:
+            with self._batch_lock:
+                self._cancel_deferred_output()
+                self._update_output(pos1, pos2)
+        else:
+            self._update_output(pos1, pos2)
+
+    def _record_frame(self, pos1=None):
+        if self.recorder is not None:
+            # Dirty rects must be read before rendering clears them
+            self.recorder.record(self.data, None if pos1 is not None else self.data.dirty_rects)
+
+    def _update_output(self, pos1=None, pos2=None):
+        self._record_frame(pos1)
+        if self.render_thread:
+            if pos1 is not None:
+                self.data.dirty_set(Rect(pos1, pos2))
+            self.commit()
+            return
+        if getattr(self.commands, "synchronized_update", False):
+            with self.commands.frame():
+                self._update(pos1, pos2)
+        else:
+            self._update(pos1, pos2)
+
+    def commit(self):
+        """Hands the changes drawn on ``Screen.data`` over to the render thread
 
+        A snapshot of the changed rows is taken, and the application can
+        go on drawing the next frame at once: the background thread compares the snapshot
+        with the displayed contents, and encodes and writes the differences.
+        If the thread is still busy with an earlier frame, the frames
+        waiting for it are merged, and only the latest contents are rendered.
+
+        Only available if the screen was created with ``render_thread=True``.
+        """
+        if not self.render_thread:
+            raise RuntimeError("Screen.commit requires a Screen created with render_thread=True")
+        with self._render_condition:
+            self._raise_render_error()
+        rows = set()
+        for rect in self.data.dirty_rects:
+            rect = Rect(rect)
+            rows.update(range(max(0, rect.top), min(rect.bottom, self.height)))
+        captured = {y: self.data.get_row(y) for y in rows}
+        self.data.dirty_clear()
+        tick_forward()
+        with self._render_condition:
+            if self._render_pending is None:
+                self._render_pending = captured
+            else:
+                self._render_pending.update(captured)
+            if self._render_worker is None:
+                self._render_stop = False
+                self._render_worker = threading.Thread(target=self._render_loop, daemon=True)
+                self._render_worker.start()
+            self._render_condition.notify_all()
+
+    def _render_loop(self):
+        condition = self._render_condition
+        try:
+            while True:
+                with condition:
+                    while self._render_pending is None and not self._render_stop:
+                        condition.wait()
+                    if self._render_pending is None:
+                        return
+                    snapshot = FrameSnapshot(self.size, self._render_pending)
+                    self._render_pending = None
+                    self._render_busy = True
+                try:
+                    if getattr(self.commands, "synchronized_update", False):
+                        with self.commands.frame():
+                            self.commands.diff_render(snapshot, self.front_buffer, snapshot.rects)
+                    else:
+                        self.commands.diff_render(snapshot, self.front_buffer, snapshot.rects)
+                except Exception as error:
+                    with condition:
+                        self._render_error = error
+                        # The frame may have been partially written: render it again on the next commit
+                        for rect in snapshot.rects:
+                            self.front_buffer.invalidate(rect)
+                        snapshot.rows.update(self._render_pending or {})
+                        self._render_pending = snapshot.rows
+                    return
+                finally:
+                    with condition:
+                        self._render_busy = False
+                        condition.notify_all()
+        finally:
+            with condition:
+                self._render_worker = None
+                condition.notify_all()
+
+    def _raise_render_error(self):
+        error = self._render_error
+        if error is not None:
+            self._render_error = None
+            raise error
+
+    def wait_render(self, timeout=None):
+        """Waits until the render thread wrote all frames committed so far
+
+        Returns False if the timeout (in seconds) expired first. If rendering
+        failed, the error is raised here (or by the next :any:`Screen.commit`),
+        and the thread is started again by the next commit.
+        """
+        with self._render_condition:
+            self._render_condition.wait_for(
+                lambda: self._render_worker is None
+                or self._render_pending is None and not self._render_busy,
+                timeout
+            )
+            self._raise_render_error()
+            return self._render_pending is None and not self._render_busy
+
+    def stop_render_thread(self):
+        """Renders any pending frame and stops the render thread
+
+        The thread is started again by the next call to :any:`Screen.commit`.
+        """
+        with self._render_condition:
+            worker = self._render_worker
+            if worker is None:
+                return
+            self._render_stop = True
+            self._render_condition.notify_all()
+        worker.join()
+
+    async def aupdate(self, pos1=None, pos2=None):
+        """Asynchronous version of :any:`Screen.update`, to be awaited in asyncio code
+
+        The frame is rendered in memory, and written to stdout without blocking
+        the event loop while the terminal drains the output.
+        """
+        if self.render_thread or not hasattr(self.commands, "frame"):
+            self.update(pos1, pos2)
+            return
+        with self._batch_lock:
+            self._cancel_deferred_output()
+        self._record_frame(pos1)
+        buffer = StringIO()
+        with self.commands.frame(file=buffer):
+            self._update(pos1, pos2)
+        await awrite_all(self.commands.output or sys.stdout, buffer.getvalue())
+
+    def _update(self, pos1=None, pos2=None):
         rect = Rect(pos1, pos2)
         if rect.c2 == (0, 0) and pos2 is None:
             rect.c2 = (self.width, self.height)
         if hasattr(self.commands, "fast_render") and self.root_context.fast_render:
             target = [rect] if pos1 is not None or self.root_context.interactive_mode else self.data.dirty_rects
-            self.commands.fast_render(self.data, target)
+            if self.front_buffer is not None and hasattr(self.commands, "diff_render"):
+                self.commands.diff_render(self.data, self.front_buffer, target)
+            else:
+                self.commands.fast_render(self.data, target)
             self.data.dirty_clear()
         else:
             with self.commands:
@@ -368,3 +632,84 @@ class Screen:
                 "]",
             ]
         )
+
+
+class FramePacer:
+    """Schedules Screen updates at a target frame rate, keeping up with the terminal
+
+    Args:
+      - screen (Screen): screen to be updated
+      - fps (float): target frames per second
+
+    Call :any:`FramePacer.update` once per iteration of the main loop, instead
+    of ``Screen.update``: it renders a frame if the terminal already took in
+    the previous one, and then waits for the time of the next frame.
+
+    Frames are dropped while the terminal is behind, i.e. if writing the last
+    frame had to wait for the output to drain. As screen changes are only marked as
+    clean when rendered, the next frame includes them, with the latest contents.
+
+    The measured output rate is available as ``drain_rate`` (characters per second),
+    and counts of frames as ``rendered_frames`` and ``dropped_frames``.
+    """
+
+    def __init__(self, screen, fps=30):
+        self.screen = screen
+        self.fps = fps
+        self.rendered_frames = 0
+        self.dropped_frames = 0
+        self.drain_rate = None
+        self.busy_until = 0
+        self.next_frame = None
+
+    @property
+    def frame_time(self):
+        return 1 / self.fps
+
+    def update(self, wait=True):
+        """Renders a frame, unless the terminal is still busy with earlier output
+
+        Args:
+          - wait (bool): whether to sleep until the time for the next frame.
+
+        Returns True if the frame was rendered, False if it was dropped.
+        """
+        if time.perf_counter() < self.busy_until:
+            self.dropped_frames += 1
+            rendered = False
+        else:
+            self._render()
+            self.rendered_frames += 1
+            rendered = True
+        if wait:
+            self.wait()
+        return rendered
+
+    def _render(self):
+        commands = self.screen.commands
+        if not hasattr(commands, "frame"):
+            self.screen.update()
+            return
+        commands.last_frame_stats = None
+        with commands.frame():
+            self.screen.update()
+        if not commands.last_frame_stats:
+            return
+        size, elapsed, waited = commands.last_frame_stats
+        if waited:
+            # The output blocked: the terminal is not keeping up.
+            rate = size / elapsed
+            self.drain_rate = rate if self.drain_rate is None else 0.8 * self.drain_rate + 0.2 * rate
+            # About as much data as was just waited on is still pending,
+            # leave the terminal as long to catch up.
+            self.busy_until = time.perf_counter() + waited
+
+    def wait(self):
+        """Sleeps until the time for the next frame"""
+        now = time.perf_counter()
+        if self.next_frame is None or now - self.next_frame > self.frame_time:
+            # Running late: do not try to catch up with missed frames
+            self.next_frame = now
+        self.next_frame += self.frame_time
+        if self.next_frame > now:
+            time.sleep(self.next_frame - now)
@@ -1,4 +1,5 @@
 from collections.abc import Sequence
+from math import ceil, floor
 
 from terminedia.transformers import TransformersContainer
 from terminedia.utils import  HookList, Rect, V2, get_current_tick
@@ -12,6 +13,7 @@ class Sprite:
     def __init__(self, shapes=None, pos=(0,0), active=False, tick_cycle=1, anchor="topleft", alpha=True):
         from terminedia.image import Shape
         self.shapes = shapes if isinstance(shapes, Sequence) and not isinstance(shapes, Shape) else [shapes]
+        self.container = None
         self.pos = pos
         self.active = active
         self.tick_cycle = tick_cycle
@@ -19,6 +21,8 @@ class Sprite:
         self._check_and_promote()
         self.transformers = TransformersContainer()
         self.dirty_previous_rect = self.rect
+        self.dirty_previous_shape = self.shape
+        self.dirty_previous_tick = None
         if alpha:
             for shape in self.shapes:
                 shape.spaces_to_transparency()
@@ -43,6 +47,21 @@ class Sprite:
     @pos.setter
     def pos(self, value):
         self._pos = V2(value)
+        self._moved()
+
+    @property
+    def anchor(self):
+        return self._anchor
+
+    @anchor.setter
+    def anchor(self, value):
+        self._anchor = value
+        self._moved()
+
+    def _moved(self):
+        self._rect_cache = None
+        if self.container is not None:
+            self.container.sprite_moved(self)
 
     @property
     def shape(self):
@@ -51,7 +70,20 @@ class Sprite:
 
     @property
     def rect(self):
-        r = Rect(self.shape.size)
+        """Area taken by the sprite in the owner shape, for the current frame
+
+        The returned Rect is cached until the sprite is moved, and should not be modified.
+        """
+        shape = self.shape
+        cached = self._rect_cache
+        if cached is not None and cached[0] is shape:
+            return cached[1]
+        r = self._shape_rect(shape)
+        self._rect_cache = shape, r
+        return r
+
+    def _shape_rect(self, shape):
+        r = Rect(shape.size)
         if self.anchor == "topleft":
             r.left = self.pos.x
             r.top = self.pos.y
@@ -59,16 +91,35 @@ class Sprite:
             r.center = self.pos
         return r
 
+    @property
+    def bounding_rect(self):
+        """Area covering the sprite in all its frames"""
+        rects = [self._shape_rect(shape) for shape in self.shapes]
+        return Rect(
+            min(r.left for r in rects), min(r.top for r in rects),
+            max(r.right for r in rects), max(r.bottom for r in rects),
+        )
+
     @property
     def dirty_rects(self):
-        changed_rect = self.rect != self.dirty_previous_rect
-        transformer_using_tick = any("tick" in transformer.signatures for transformer in self.transformers)
-        if changed_rect or transformer_using_tick:
-            dirty = {(self.rect - self.rect.c1).as_tuple}
+        """Changed areas since the last call, in sprite coordinates"""
+        tick = get_current_tick()
+        shape = self.shape
+        whole = (self.rect - self.rect.c1).as_tuple
+        if self.rect != self.dirty_previous_rect or shape is not self.dirty_previous_shape:
+            dirty = {whole}
         else:
-            dirty = self.shape.dirty_rects
+            dirty = set(shape.dirty_rects)
+            for transformer in self.transformers:
+                if transformer.tick_changed(self.dirty_previous_tick, tick):
+                    if transformer.rect is None:
+                        dirty = {whole}
+                        break
+                    dirty.add(transformer.rect.as_tuple)
 
         self.dirty_previous_rect = self.rect
+        self.dirty_previous_shape = shape
+        self.dirty_previous_tick = tick
         return dirty
 
     def owner_coords(self, rect, where=None):
@@ -90,21 +141,108 @@ class Sprite:
             pixel = self.transformers.process(self.shape, pos, pixel)
         return pixel
 
+    def get_row(self, y, x0, x1):
+        """Reads a span of the current sprite shape, in sprite coordinates, applying its transformers"""
+        shape = self.shape
+        row = shape.get_row(y, x0, x1)
+        if self.transformers:
+            row = self.transformers.process_row(shape, V2(x0, y), row)
+        return row
+
 
 class SpriteContainer(HookList):
+    """List of sprites over an owner shape
+
+    Sprites are indexed in a uniform grid of square cells, so
+    that reading a pixel only has to check the sprites overlapping
+    its cell. The index is updated as sprites are moved, and
+    rebuilt when sprites are added or removed.
+    """
+
+    #: Side of the grid cells used to index the sprites by position
+    index_cell_size = 16
+
+    _index = None
+
     def __init__(self, owner):
         super().__init__()
         self.owner = owner
+        self._index = None
 
     def insert_hook(self, item):
         if not isinstance(item, Sprite):
             item = Sprite(item)
         item.owner = self.owner
+        item.container = self
+        self._index = None
         return item
 
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._index = None
+
+    def _sprite_cells(self, sprite):
+        size = self.index_cell_size
+        rect = sprite.bounding_rect
+        return [
+            (cx, cy)
+            for cy in range(floor(rect.top) // size, (ceil(rect.bottom) - 1) // size + 1)
+            for cx in range(floor(rect.left) // size, (ceil(rect.right) - 1) // size + 1)
+        ]
+
+    def _build_index(self):
+        # Cells keep their sprites in the same order they are composed: last sprite first
+        self._index = index = {}
+        self._index_cells = {}
+        self._z_order = {}
+        for z, sprite in enumerate(reversed(self.data)):
+            self._z_order[id(sprite)] = z
+            cells = self._index_cells[id(sprite)] = self._sprite_cells(sprite)
+            for cell in cells:
+                index.setdefault(cell, []).append(sprite)
+
+    def sprite_moved(self, sprite):
+        """Updates the index for a sprite which position or size changed"""
+        if self._index is None or id(sprite) not in self._index_cells:
+            self._index = None
+            return
+        index = self._index
+        for cell in self._index_cells[id(sprite)]:
+            index[cell].remove(sprite)
+        cells = self._index_cells[id(sprite)] = self._sprite_cells(sprite)
+        z_order = self._z_order
+        for cell in cells:
+            bucket = index.setdefault(cell, [])
+            bucket.append(sprite)
+            if len(bucket) > 1:
+                bucket.sort(key=lambda sprite: z_order[id(sprite)])
+
+    def sprites_at(self, pos):
+        """Sprites which may overlap a position, in composition order"""
+        if self._index is None:
+            self._build_index()
+        size = self.index_cell_size
+        return self._index.get((floor(pos[0]) // size, floor(pos[1]) // size), ())
+
+    def sprites_in_row(self, y, x0, x1):
+        """Sprites which may overlap a span in a row, in composition order"""
+        if self._index is None:
+            self._build_index()
+        size = self.index_cell_size
+        cy = floor(y) // size
+        index = self._index
+        found = {}
+        for cx in range(floor(x0) // size, (ceil(x1) - 1) // size + 1):
+            for sprite in index.get((cx, cy), ()):
+                found[id(sprite)] = sprite
+        if len(found) < 2:
+            return list(found.values())
+        z_order = self._z_order
+        return sorted(found.values(), key=lambda sprite: z_order[id(sprite)])
+
     def get_at(self, pos, pixel=None):
         pcls = type(pixel)
-        for sprite in reversed(self.data):
+        for sprite in self.sprites_at(pos):
             if not sprite.active:
                 continue
             if pos in sprite.rect:
@@ -115,6 +253,34 @@ class SpriteContainer(HookList):
                     pixel = new_pixel
         return pixel if isinstance(pixel, pcls) else pcls(*pixel)
 
+    def get_row(self, y, x0, x1, row):
+        """Composes active sprites over a span of owner pixels
+
+        Args:
+          - y, x0, x1: row and span limits, in owner coordinates
+          - row: sequence of per-channel lists with the owner contents in the span
+
+        Returns a list with the per-channel lists updated in place.
+        """
+        row = [channel if isinstance(channel, list) else list(channel) for channel in row]
+        for sprite in self.sprites_in_row(y, x0, x1):
+            if not sprite.active:
+                continue
+            rect = sprite.rect
+            left, top = int(rect.left), int(rect.top)
+            if not top <= y < top + rect.height:
+                continue
+            start = max(x0, left)
+            stop = min(x1, left + rect.width)
+            if start >= stop:
+                continue
+            sprite_row = sprite.get_row(y - top, start - left, stop - left)
+            for channel, sprite_channel in zip(row, sprite_row):
+                for i, value in enumerate(sprite_channel, start - x0):
+                    if value is not TRANSPARENT:
+                        channel[i] = value
+        return row
+
     def add(self, item, pos=(0,0), active=True, tick_cycle=1, anchor="topleft", alpha=True):
         if not isinstance(item, Sprite):
             item = Sprite(item, pos, active, tick_cycle, anchor, alpha=alpha)
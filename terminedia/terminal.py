@@ -1,17 +1,26 @@
-import re
-import time
+import asyncio
+import os
+import select
 import sys
+import time
+from contextlib import contextmanager
 from functools import lru_cache
 from io import StringIO
+from itertools import repeat
 from threading import Lock
 
 from terminedia.backend_common import BackendColorContextMixin, JournalingCommandsMixin
 from terminedia.unicode import char_width
 from terminedia.unicode_transforms import translate_chars
-from terminedia.utils import V2, Color, Rect
+from terminedia.utils import V2, Color, DirtyRegion, Rect
+from terminedia.utils.colors import PACKED_SPECIAL_FLAG, palette_index
 from terminedia.values import DEFAULT_BG, DEFAULT_FG, Effects, unicode_effects_set, ESC, UNICODE_EFFECTS, TERMINAL_EFFECTS, CONTINUATION, EMPTY, TRANSPARENT
 
-use_re_split = sys.version_info >= (3, 7)
+
+#: DEC private mode 2026 ("synchronized output") sequences: terminals supporting it
+#: hold repainting the screen between these, ignoring them otherwise.
+SYNCHRONIZED_UPDATE_BEGIN = "\x1b[?2026h"
+SYNCHRONIZED_UPDATE_END = "\x1b[?2026l"
 
 E = Effects
 
@@ -69,6 +78,373 @@ effect_double_off = {
 
 unicode_effect_cache = {}
 
+_NOT_SET = object()
+
+#: Caches for SGR sequences, shared by all ScreenCommands instances. Keys use
+#: packed color values (see :any:`Color.packed`) and effect flags as integers.
+sgr_color_cache = {}
+sgr_transition_cache = {}
+sgr_effects_cache = {}
+#: Maximum number of entries in each SGR cache. A full cache is emptied
+#: before a new entry is added, so that applications going through
+#: lots of colors (e.g. animated gradients) do not grow it without limit.
+SGR_CACHE_SIZE = 4096
+
+
+def _cache_store(cache, key, value):
+    if len(cache) >= SGR_CACHE_SIZE:
+        cache.clear()
+    cache[key] = value
+    return value
+
+
+def _sgr_color_key(color, depth=24):
+    """Internal: key telling apart the colors as rendered at the given depth"""
+    try:
+        packed = color.packed
+    except AttributeError:
+        packed = Color(color).packed
+    if depth == 24 or packed & PACKED_SPECIAL_FLAG:
+        return packed
+    # Colors mapped to the same palette entry share a key, so that
+    # changes between them are not sent to the terminal.
+    return ~palette_index(packed, depth)
+
+
+def sgr_color_params(color, background=False, depth=24):
+    """SGR parameters setting a foreground or background color, as a string
+
+    Args:
+      - color: Color, or value accepted by the Color constructor
+      - background (bool): whether to set the background color
+      - depth (int): color depth of the terminal: 24 for RGB colors,
+            8 for the 256 color palette and 4 for the 16 basic colors.
+    """
+    key = (_sgr_color_key(color, depth), background, depth)
+    try:
+        return sgr_color_cache[key]
+    except KeyError:
+        pass
+    if color == (DEFAULT_BG if background else DEFAULT_FG):
+        params = "49" if background else "39"
+    elif depth == 24:
+        params = ("48;2;{};{};{}" if background else "38;2;{};{};{}").format(*Color(color))
+    else:
+        index = palette_index(Color(color).packed, depth)
+        if depth == 8:
+            params = f"{48 if background else 38};5;{index}"
+        else:
+            base = (40 if background else 30) if index < 8 else (100 if background else 90)
+            params = str(base + index % 8)
+    _cache_store(sgr_color_cache, key, params)
+    return params
+
+
+def sgr_transition(previous, new, colors=(None, None), depth=24):
+    """Complete SGR sequence to change the terminal attributes from 'previous' to 'new'
+
+    Args:
+      - previous: (foreground, background, effects) keys for the attributes in effect.
+            Foreground and background are packed color values and effects
+            an integer with terminal effect flags. None stands for an unknown attribute.
+      - new: (foreground, background, effects) keys for the desired attributes.
+            None stands for "keep the current attribute" (i.e. TRANSPARENT).
+      - colors: the (foreground, background) color objects for the new attributes,
+            used to render the sequence on a cache miss.
+      - depth (int): terminal color depth, as in :any:`sgr_color_params`.
+            Color keys must have been computed with the same depth.
+
+    Returns the escape sequence, or an empty string if no change is needed.
+    """
+    key = (previous, new, depth)
+    try:
+        return sgr_transition_cache[key]
+    except KeyError:
+        pass
+    last_fg, last_bg, last_tm_effects = previous
+    fg, bg, tm_effects = new
+    params = []
+    reset = tm_effects is not None and last_tm_effects is None
+    if reset:
+        # The previous effects are unknown: an explicit reset is needed.
+        # It also resets the colors, so these are sent again.
+        params.append("0")
+    if fg is not None and (fg != last_fg or reset):
+        params.append(sgr_color_params(colors[0], depth=depth))
+    if bg is not None and (bg != last_bg or reset):
+        params.append(sgr_color_params(colors[1], background=True, depth=depth))
+    if tm_effects is not None and tm_effects != last_tm_effects:
+        effects = Effects(tm_effects)
+        if last_tm_effects:
+            for effect in Effects(last_tm_effects):
+                if effect not in effects:
+                    params.append(str(effect_off_map[effect]))
+        for effect in effects:
+            params.append(str(effect_on_map[effect]))
+    result = "\x1b[" + ";".join(params) + "m" if params else ""
+    _cache_store(sgr_transition_cache, key, result)
+    return result
+
+
+@lru_cache(maxsize=4096)
+def cursor_movement(from_pos, to_pos, relative_only=False):
+    """Shortest ANSI sequence to move the cursor between two screen positions
+
+    Args:
+      - from_pos (2-tuple): current cursor position. The column can be None
+            if it is not known (e.g. right after writing in the last column of the
+            terminal, as cursor movement is deferred there).
+      - to_pos (2-tuple): target position
+      - relative_only (bool): if set, only movements relative to the starting
+            point are used, so that the output can be relocated.
+
+    Candidates are absolute positioning (CUP), cursor forward/backwards (CUF/CUB),
+    absolute column (CHA), carriage return and line feed, combined with up/down
+    movements (CUU/CUD) as needed.
+    """
+    CSI = "\x1b["
+    (lx, ly), (x, y) = from_pos, to_pos
+    dx = x - lx if lx is not None else None
+    dy = y - ly
+
+    def amount(value, command):
+        return f"{CSI}{value if value != 1 else ''}{command}"
+
+    vertical = "" if not dy else amount(dy, "B") if dy > 0 else amount(-dy, "A")
+    candidates = []
+    if dx is not None:
+        candidates.append(("" if not dx else amount(dx, "C") if dx > 0 else amount(-dx, "D")) + vertical)
+    if not relative_only:
+        candidates.append(f"{CSI}{y + 1};{x + 1}H")
+        candidates.append(f"{CSI}{x + 1}G" + vertical)
+        if x == 0:
+            candidates.append("\r" + vertical)
+            if dy == 1:
+                candidates.append("\r\n")
+    elif x == 0 and dy == 1:
+        candidates.append("\n")
+    return min(candidates, key=len)
+
+
+def sgr_effects_params(effects, reset=True, turn_off=False):
+    """SGR parameters to apply a set of effects, and the unicode effects among them
+
+    See :any:`ScreenCommands.set_effects`. Returns a (sgr_codes, active_unicode_effects) tuple.
+    """
+    key = (int(effects), reset, turn_off)
+    try:
+        return sgr_effects_cache[key]
+    except KeyError:
+        pass
+    sgr_codes = []
+
+    effect_map = effect_off_map if turn_off else effect_on_map
+    active_unicode_effects = Effects.none
+
+    for effect_enum in Effects:
+        if effect_enum is Effects.none:
+            continue
+        if effect_enum in unicode_effects_set:
+            if effect_enum & effects:
+                active_unicode_effects |= effect_enum
+            continue
+        if effect_enum & effects:
+            sgr_codes.append(effect_map[effect_enum])
+        elif reset and (
+            not effect_enum in effect_double_off
+            or not any(e & effects for e in effect_double_off[effect_enum])
+        ):
+            sgr_codes.append(effect_off_map[effect_enum])
+    result = _cache_store(sgr_effects_cache, key, (tuple(sgr_codes), active_unicode_effects))
+    return result
+
+def _wait_writable(file, timeout=0.1):
+    """Waits until a file blocking on writes can take more data. Returns the time waited."""
+    started = time.perf_counter()
+    try:
+        select.select([], [file.fileno()], [], timeout)
+    except (AttributeError, OSError, ValueError):
+        time.sleep(0.001)
+    return time.perf_counter() - started
+
+
+def write_all(file, text, flush=True):
+    """Writes text to a file, waiting for it to drain if it is non-blocking
+
+    Args:
+      - file (TextIO): output stream
+      - text (str): text to be written
+      - flush (bool): whether to flush the file afterwards
+
+    The file descriptor for stdout may be set to non-blocking mode (i.e. when
+    reading the keyboard, as both share the terminal), and writes then fail
+    if the terminal does not keep up with the output. When possible, the text is
+    encoded and written to the underlying binary buffer, so that the data
+    not taken on a failure can be exactly resent.
+
+    Returns the time spent waiting for the output to drain, in seconds.
+    """
+    waited = 0.0
+    buffer = getattr(file, "buffer", None)
+    if buffer is not None:
+        while True:
+            try:
+                # Anything already in the text layer must go first
+                file.flush()
+                break
+            except BlockingIOError:
+                waited += _wait_writable(file)
+        data = text.encode(file.encoding or "utf-8", file.errors or "strict")
+        file = buffer
+    else:
+        data = text
+    while data:
+        try:
+            file.write(data)
+            break
+        except BlockingIOError as error:
+            data = data[error.characters_written:]
+            waited += _wait_writable(file)
+    while flush:
+        try:
+            file.flush()
+            break
+        except BlockingIOError:
+            waited += _wait_writable(file)
+    return waited
+
+
+class ByteSink:
+    """Text output stream writing UTF-8 encoded bytes directly to a file descriptor
+
+    Args:
+      - target (Optional[Union[int, BinaryIO]]): file descriptor, or binary file, to write to.
+            Defaults to the file descriptor for stdout.
+
+    Text written is encoded into a bytearray, reused from one flush to the next,
+    and written on ``flush`` with as few ``os.write`` calls as the
+    output takes, bypassing the buffering and encoding layers in ``sys.stdout``.
+    It can be used as the ``file`` in rendering methods, or set as the ``output`` of a
+    :any:`ScreenCommands` instance.
+    """
+
+    encoding = "utf-8"
+
+    def __init__(self, target=None):
+        if target is None:
+            target = sys.stdout.fileno()
+        self.target = target
+        self.name = f"<fd {target}>" if isinstance(target, int) else getattr(target, "name", repr(target))
+        self.data = bytearray()
+        self.length = 0
+
+    def write(self, text):
+        encoded = text.encode("utf-8")
+        end = self.length + len(encoded)
+        self.data[self.length:end] = encoded
+        self.length = end
+        return len(text)
+
+    def flush(self):
+        if not self.length:
+            return
+        try:
+            with memoryview(self.data) as view:
+                if not isinstance(self.target, int):
+                    self.target.write(view[:self.length])
+                    self.target.flush()
+                    return
+                written = 0
+                while written < self.length:
+                    try:
+                        written += os.write(self.target, view[written:self.length])
+                    except BlockingIOError:
+                        _wait_writable(self)
+        finally:
+            self.length = 0
+
+    def fileno(self):
+        if isinstance(self.target, int):
+            return self.target
+        return self.target.fileno()
+
+    def getvalue(self):
+        """Bytes written and not flushed yet"""
+        return bytes(self.data[:self.length])
+
+
+async def awrite_all(file, text):
+    """Writes text to a file without blocking the running asyncio event loop
+
+    Args:
+      - file (TextIO): output stream
+      - text (str): text to be written
+
+    The file descriptor is set to non-blocking mode while writing, and whenever
+    the output is not drained fast enough, the coroutine waits for it to be
+    writable again using ``loop.add_writer``. Files without a
+    descriptor are written synchronously.
+    """
+    try:
+        fd = file.fileno()
+    except (AttributeError, OSError):
+        write_all(file, text)
+        return
+    # Anything written before should reach the output first
+    write_all(file, "")
+    loop = asyncio.get_running_loop()
+    data = memoryview(text.encode(getattr(file, "encoding", None) or "utf-8"))
+    blocking = os.get_blocking(fd)
+    os.set_blocking(fd, False)
+    try:
+        while data:
+            try:
+                data = data[os.write(fd, data):]
+            except BlockingIOError:
+                ready = loop.create_future()
+                loop.add_writer(fd, lambda: ready.done() or ready.set_result(None))
+                try:
+                    await ready
+                finally:
+                    loop.remove_writer(fd)
+    finally:
+        os.set_blocking(fd, blocking)
+
+
+def _cell_runs(cells):
+    """Groups consecutive cells with the same contents in a row
+
+    Args:
+      - cells: iterable of (x, y, char, foreground, background, effects) tuples
+
+    Yields (cell, count) pairs, where 'cell' is the first cell in a run of
+    'count' horizontally adjacent cells. Only single-width characters
+    are grouped.
+    """
+    run = None
+    count = 0
+    groupable = False
+    for cell in cells:
+        if (
+            groupable and cell[1] == run[1] and cell[0] == run[0] + count
+            and cell[2] == run[2] and cell[5] == run[5]
+            and (cell[3] is run[3] or cell[3] == run[3]) and (cell[4] is run[4] or cell[4] == run[4])
+        ):
+            count += 1
+            continue
+        if run is not None:
+            yield run, count
+        run = cell
+        count = 1
+        char = cell[2]
+        groupable = (
+            isinstance(char, str) and len(char) == 1 and char.isprintable()
+            and (char.isascii() or char_width(char) == 1)
+        )
+    if run is not None:
+        yield run, count
+
+
 class ScreenCommands(BackendColorContextMixin):
     """Low level functions to execute ANSI-Sequence-related tasks on the terminal.
 
@@ -81,12 +457,30 @@ class ScreenCommands(BackendColorContextMixin):
 
     locks = {}
     last_pos = None
-
-    def __init__(self, absolute_movement=True):
+    #: Internal: collects the output written to stdout inside a :any:`ScreenCommands.frame` block
+    frame_buffer = None
+    #: Stream used for the output when no file is given, if set. (e.g. a :any:`ByteSink`).
+    #: Defaults to None, meaning sys.stdout
+    output = None
+    #: Size in characters, total time writing and time waiting for the output to drain,
+    #: in seconds, for the last frame written by :any:`ScreenCommands.frame`
+    last_frame_stats = None
+
+    def __init__(self, absolute_movement=True, run_length_encoding=False, color_depth=24, synchronized_update=False):
         self.alternate_terminal_buffer = 0
         self.active_unicode_effects = Effects.none
         self.__class__.last_pos = None
         self.absolute_movement = absolute_movement
+        #: Whether the terminal supports the REP ("CSI n b") and ECH ("CSI n X")
+        #: sequences: if set, runs of repeated characters are rendered with those.
+        self.run_length_encoding = run_length_encoding
+        #: Number of bits per color the terminal supports: 24 for RGB ("true color"),
+        #: 8 for the 256 color palette or 4 for the 16 basic colors.
+        #: Colors are mapped to the closest palette entry on lower depths.
+        self.color_depth = color_depth
+        #: Whether frames rendered in a :any:`ScreenCommands.frame` block are enclosed in the
+        #: "synchronized output" sequences, so that the terminal displays them at once.
+        self.synchronized_update = synchronized_update
 
     def __repr__(self):
         return "".join(
@@ -98,7 +492,7 @@ class ScreenCommands(BackendColorContextMixin):
             ]
         )
 
-    def _print(self, *args, sep="", end="", flush=True, file=None, count=0):
+    def _print(self, *args, sep="", end="", flush=True, file=None):
         """Inner print method
 
         Args:
@@ -106,46 +500,56 @@ class ScreenCommands(BackendColorContextMixin):
           - sep: Separator to join \\*args
           - end: Sequence to print at end
           - flush: Whether to flush stdin file at end, defaults to ``True``
-          - count: Retry counter - used to calculate delays on retries, or raise
-            on max-retries exceeded (currently hardcoded to 10 atempts)
 
         Is used in place of normal Python's print, changing the defaults
         to values more suitable to the internal usage.
-        Also, takes care of eventual blocking in stdout due to excess data -
-        and implements a retry mechanism to mitigate that.
+        Also, takes care of eventual blocking in stdout due to excess data
+        (see :any:`write_all`).
         """
         if file is None:
-            file = sys.stdout
+            if self.frame_buffer is not None:
+                self.frame_buffer.write(sep.join(args) + end)
+                return
+            file = self.output if self.output is not None else sys.stdout
         if sys.platform == "win32":
             print(sep.join(args), end=end, flush=flush, file=file)
             return
+        write_all(file, sep.join(args) + end, flush=flush)
+
+    def _default_file(self):
+        if self.frame_buffer is not None:
+            return self.frame_buffer
+        return self.output if self.output is not None else sys.stdout
+
+    @contextmanager
+    def frame(self, file=None):
+        """Context manager collecting the output of a frame in a single write
+
+        Args:
+          - file (Optional[TextIO]): output stream. Defaults to ``self.output`` or sys.stdout
+
+        Everything rendered to stdout inside the block is buffered, and written
+        at once when it ends - enclosed in the DEC "synchronized output" sequences if
+        ``synchronized_update`` is set. Blocks can be nested: the output
+        is written when the outermost one ends.
+        """
+        if self.frame_buffer is not None:
+            yield self.frame_buffer
+            return
+        self.frame_buffer = buffer = StringIO()
         try:
-            if len(args) == 1 and "\x1b" in args[0] and file is sys.stdout:
-                # Separate a long sequence in one write operation for each
-                # ANSI command
-                sep = end = ""
-                if use_re_split:
-                    # This is new in Python 3.7
-                    args = re.split("(?=\x1b)", args[0])
-                else:
-                    args = [
-                        ("\x1b" if i else "") + arg
-                        for i, arg in enumerate(args[0].split("\x1b"))
-                    ]
-            for arg in args:
-                file.write(arg)
-                if sep:
-                    file.write(sep)
-            if end:
-                file.write(end)
-            if flush:
-                file.flush()
-        except BlockingIOError:
-            if count > 10:
-                print("arrrrghhhh - stdout clogged out!!!", file=sys.stderr)
-                raise
-            time.sleep(0.002 * 2 ** count)
-            self._print(*args, sep=sep, end=end, flush=flush, file=file, count=count + 1)
+            yield buffer
+        finally:
+            self.frame_buffer = None
+            text = buffer.getvalue()
+            if text:
+                if self.synchronized_update:
+                    text = SYNCHRONIZED_UPDATE_BEGIN + text + SYNCHRONIZED_UPDATE_END
+                if file is None:
+                    file = self.output if self.output is not None else sys.stdout
+                started = time.perf_counter()
+                waited = write_all(file, text)
+                self.last_frame_stats = (len(text), time.perf_counter() - started, waited)
 
     def fast_render(self, data, rects=None, file=None):
         key = getattr(file, "name", "<stdout>")
@@ -156,91 +560,184 @@ class ScreenCommands(BackendColorContextMixin):
 
     def _fast_render(self, data, rects=None, file=None):
         if file is None:
-            file = sys.stdout
+            file = self._default_file()
         if rects is None:
-            rects = {Rect((0,0), data.size)}
-        CSI = "\x1b["
-        SGR = "m"
-        MOVE = "H"
-        last_pos = self.__class__.last_pos
-        last_fg = last_bg = last_tm_effects = last_un_effects = None
-        seen = set()
-        for rect in sorted(rects):
+            rects = [Rect((0,0), data.size)]
+        elif len(rects) > 1:
+            # Merge possibly overlapping areas, so that no cell is rendered twice
+            region = DirtyRegion(data.size, tile_size=1)
+            for rect in rects:
+                region.mark_rect(rect)
+            rects = region.rects()
+        state = {"last_pos": self.__class__.last_pos}
+        parts = []
+        for rect in rects:
             if not isinstance(rect, Rect):
                 rect = Rect(rect)
-            outstr = ""
-            for y in range(rect.top, rect.bottom):
-                for x in range(rect.left, rect.right):
-                    if (x, y) in seen: continue
-                    seen.add((x, y))
-                    # Fast render just for full-4tuple values.
-                    char, fg, bg, effects = data[x, y]
-                    if effects != TRANSPARENT:
-                        tm_effects = effects & TERMINAL_EFFECTS
-                        un_effects = effects & UNICODE_EFFECTS
+            parts.append(self.encode_cells(self._iter_rect_cells(data, rect), state, width=data.width))
+
+        write_all(file, "".join(parts))
+
+        self.__class__.last_pos = state["last_pos"]
+
+    def _iter_rect_cells(self, data, rect):
+        x0 = max(0, rect.left)
+        for y in range(rect.top, rect.bottom):
+            # Fast render just for full-4tuple values.
+            row = data.get_row(y, x0, rect.right)
+            for x, char, fg, bg, effects in zip(range(x0, rect.right), *row):
+                yield x, y, char, fg, bg, effects
+
+    def diff_render(self, data, front_buffer, rects=None, file=None):
+        """Renders only the cells that differ from what is already displayed
+
+        Args:
+          - data (FullShape): contents to be displayed
+          - front_buffer (FrontBuffer): record of the contents currently displayed
+                on the output. It is updated as the cells are rendered.
+          - rects (Optional[Iterable[Rect]]): areas to check for changes. Defaults to the whole shape.
+          - file (Optional[TextIO]): output stream. Defaults to ``self.output`` or sys.stdout
+        """
+        key = getattr(file, "name", "<stdout>")
+        if key not in self.__class__.locks:
+            self.__class__.locks[key] = Lock()
+        with self.__class__.locks[key]:
+            if file is None:
+                file = self._default_file()
+            state = {"last_pos": self.__class__.last_pos}
+            outstr = self.encode_cells(
+                front_buffer.changed_cells(data, rects), state,
+                width=data.width, known=front_buffer.displayed_text
+            )
+            if outstr:
+                write_all(file, outstr)
+            self.__class__.last_pos = state["last_pos"]
+
+    def encode_cells(self, cells, state, width=None, known=None):
+        """Builds the ANSI sequences to display a series of cells, and returns them as a string
+
+        Args:
+          - cells: iterable of (x, y, char, foreground, background, effects) tuples
+          - state (dict): last issued cursor position and attributes for the output.
+                Start with ``{"last_pos": None}`` for an output in an unknown state.
+                It is updated in place, so that it can be carried over several calls.
+          - width (Optional[int]): output width, if known.
+          - known: optional callable (y, x0, x1, attrs) returning the text displayed in
+                a span of cells if it is known and uses the given attributes, or None
+                (e.g. ``FrontBuffer.displayed_text``).
+
+        This is the encoder used by ``fast_render`` and ``diff_render``; it can
+        also be used to render to outputs other than this instance's, each with its
+        own state, as :any:`Broadcaster` and :any:`Player` do. Nothing is written.
+        Attribute changes are rendered by :any:`sgr_transition`, and the output
+        is collected in a list joined at the end.
+        """
+        CSI = "\x1b["
+        last_pos = state.get("last_pos")
+        anchored = state.get("anchored", False)
+        last_attrs = (state.get("fg"), state.get("bg"), state.get("tm_effects"))
+        parts = []
+        append = parts.append
+        cells = _cell_runs(cells) if self.run_length_encoding else zip(cells, repeat(1))
+        depth = self.color_depth
+        # Cells usually share color instances: avoid recomputing their keys
+        fg_obj = bg_obj = effects_obj = _NOT_SET
+        for (x, y, char, fg, bg, effects), count in cells:
+            if fg is not fg_obj:
+                fg_obj = fg
+                fg_key = None if fg is TRANSPARENT else _sgr_color_key(fg, depth)
+            if bg is not bg_obj:
+                bg_obj = bg
+                bg_key = None if bg is TRANSPARENT else _sgr_color_key(bg, depth)
+            if effects is not effects_obj:
+                effects_obj = effects
+                if effects is not TRANSPARENT:
+                    tm_key = int(effects & TERMINAL_EFFECTS)
+                    un_effects = effects & UNICODE_EFFECTS
+                else:
+                    tm_key = None
+                    un_effects = Effects.none
+
+            new_attrs = (fg_key, bg_key, tm_key)
+            if new_attrs != last_attrs:
+                append(sgr_transition(last_attrs, new_attrs, (fg, bg), depth))
+                if last_attrs[2] is None and tm_key is not None:
+                    # A reset was issued: colors not set along with it are unknown
+                    last_attrs = new_attrs
+                else:
+                    last_attrs = tuple(
+                        new if new is not None else last for new, last in zip(new_attrs, last_attrs)
+                    )
+
+            if char is CONTINUATION:
+                # ensure two spaces for terminedia double-width chars -
+                # can possibly be made more efficient if run in a terminal
+                # that treat those correctly (not the case in current era konsole)
+                append(EMPTY)
+            if char not in (TRANSPARENT, CONTINUATION):
+                if (x, y) != last_pos:
+                    append(self._plan_movement(last_pos, (x, y), anchored, width, known, last_attrs))
+                    anchored = True
+                final_char = self.apply_unicode_effects(char, un_effects) if un_effects else char
+                append(final_char)
+
+                if final_char.isascii() or len(final_char) == 1 and char_width(final_char) == 1:
+                    last_pos = (x + 1, y)
+                else:
+                    # The actual column depends on the terminal
+                    last_pos = None
+                if count > 1:
+                    if last_pos is None:
+                        append(final_char * (count - 1))
                     else:
-                        tm_effects = un_effects = Effects.none
-
-                    csi = False
-
-                    if fg != last_fg and fg != TRANSPARENT:
-                        outstr += CSI
-                        csi = True
-                        if fg == DEFAULT_FG:
-                            outstr += "39"
-                        else:
-                            outstr += "38;2;{};{};{}".format(*fg)
-
-                    if bg != last_bg and bg != TRANSPARENT:
-                        if not csi:
-                            outstr += CSI
-                            csi = True
-                        else:
-                            outstr += ";"
-                        if bg == DEFAULT_BG:
-                            outstr += "49"
-                        else:
-                            outstr += "48;2;{};{};{}".format(*bg)
-
-                    if tm_effects != last_tm_effects and effects != TRANSPARENT:
-                        semic = ";"
-                        if not csi:
-                            outstr += CSI
-                            semic = ""
-                            csi = True
-
-                        if last_tm_effects:
-                            for effect in last_tm_effects:
-                                if effect not in tm_effects:
-                                    outstr += f"{semic}{effect_off_map[effect]}"
-                                    semic = ";"
-                        for effect in tm_effects:
-                            outstr += f"{semic}{effect_on_map[effect]}"
-                            semic = ";"
-
-                    if csi:
-                        outstr += "m"
-                        last_fg = fg; last_bg = bg; last_tm_effects = tm_effects
-                    if char is CONTINUATION:
-                        # ensure two spaces for terminedia double-width chars -
-                        # can possibly be made more efficient if run in a terminal
-                        # that treat those correctly (not the case in current era konsole)
-                        outstr += EMPTY
-                    if char not in (TRANSPARENT, CONTINUATION):
-                        if (x, y) != last_pos:
-                            # TODO: relative movement?
-                            outstr += CSI + f"{y + 1};{x + 1}H"
-                        final_char = self.apply_unicode_effects(char, un_effects)
-                        outstr += final_char
-
-                        last_pos = (x + 1, y)
-
-            # TODO: temporarily disable 'non-blocking' for stdout
-            file.write(outstr); file.flush()
-
-            self.__class__.last_pos = last_pos
+                        last_pos = self._encode_repeat(append, final_char, count - 1, last_pos, tm_key)
+
+        state.update(
+            last_pos=last_pos, anchored=anchored,
+            fg=last_attrs[0], bg=last_attrs[1], tm_effects=last_attrs[2]
+        )
+        return "".join(parts)
 
+    def _encode_repeat(self, append, char, repeat_count, pos, tm_effects):
+        """Internal: renders 'char' 'repeat_count' more times, starting at 'pos'
 
+        Spaces without terminal effects are erased with ECH, which fills
+        the cells with the current background but does not move the cursor.
+        Other characters are repeated with REP when that is shorter.
+
+        Returns the cursor position after the output.
+        """
+        x, y = pos
+        plain = char * repeat_count
+        if char == " " and not tm_effects:
+            erase = f"\x1b[{repeat_count}X"
+            # The cursor will most likely have to be moved past the erased cells
+            if len(erase) + len(cursor_movement(pos, (x + repeat_count, y))) < repeat_count:
+                append(erase)
+                return pos
+        rep = f"\x1b[{repeat_count}b"
+        append(rep if len(rep) < len(plain.encode("utf-8")) else plain)
+        return (x + repeat_count, y)
+
+    def _plan_movement(self, last_pos, pos, anchored, width=None, known=None, attrs=None):
+        """Internal: picks the cheapest way to move the cursor while rendering
+
+        Relative movements are only used if the cursor was positioned
+        in the current output ("anchored"). If 'known' is given, skipped cells
+        whose displayed contents and attributes are known may be re-printed instead.
+        """
+        if not anchored or last_pos is None:
+            return f"\x1b[{pos[1] + 1};{pos[0] + 1}H"
+        if width is not None and last_pos[0] >= width:
+            # After writing in the last column the terminal defers moving the cursor
+            return cursor_movement((None, last_pos[1]), pos)
+        movement = cursor_movement(last_pos, pos)
+        gap = pos[0] - last_pos[0]
+        if known is not None and pos[1] == last_pos[1] and 0 < gap < len(movement):
+            text = known(pos[1], last_pos[0], pos[0], attrs)
+            if text is not None and len(text.encode("utf-8")) < len(movement):
+                return text
+        return movement
 
     def CSI(self, *args, file=None):
         """Writes a CSI command to the terminal
@@ -333,22 +830,10 @@ class ScreenCommands(BackendColorContextMixin):
         if self.absolute_movement:
             self.CSI(f"{pos.y + 1};{pos.x + 1}H", file=file)
         else:
-            if self.__class__.last_pos and pos.x == 0 and pos.y == self.__class__.last_pos.y + 1:
-                self._print("\n", file=file)
-            else:
-                if not self.__class__.last_pos:
-                    self.__class__.last_pos = V2(0,0)
-                delta_x = pos.x - self.__class__.last_pos.x
-                delta_y = pos.y - self.__class__.last_pos.y
-                if delta_x > 0:
-                    self.right(delta_x, file=file)
-                elif delta_x < 0:
-                    self.left(-delta_x, file=file)
-
-                if delta_y > 0:
-                    self.down(delta_y, file=file)
-                elif delta_y < 0:
-                    self.up(-delta_y, file=file)
+            last_pos = self.__class__.last_pos or V2(0, 0)
+            movement = cursor_movement(tuple(last_pos), tuple(pos), relative_only=True)
+            if movement:
+                self._print(movement, file=file)
 
         self.__class__.last_pos = pos
 
@@ -432,19 +917,13 @@ class ScreenCommands(BackendColorContextMixin):
         """Writes ANSI sequence to set the foreground color
         color: RGB  3-sequence (0.0-1.0 or 0-255 range) or color constant
         """
-        if color == DEFAULT_FG:
-            self.SGR(39, file=file)
-        else:
-            self.SGR(38, 2, *Color(color), file=file)
+        self.SGR(sgr_color_params(color, depth=self.color_depth), file=file)
 
     def set_bg_color(self, color, file=None):
         """Writes ANSI sequence to set the background color
         color: RGB  3-sequence (0.0-1.0 or 0-255 range) or color constant
         """
-        if color == DEFAULT_BG:
-            self.SGR(49, file=file)
-        else:
-            self.SGR(48, 2, *Color(color), file=file)
+        self.SGR(sgr_color_params(color, background=True, depth=self.color_depth), file=file)
 
     def set_effects(
         self,
@@ -479,25 +958,7 @@ class ScreenCommands(BackendColorContextMixin):
         if effects is TRANSPARENT:
             return
 
-        sgr_codes = []
-
-        effect_map = effect_off_map if turn_off else effect_on_map
-        active_unicode_effects = Effects.none
-
-        for effect_enum in Effects:
-            if effect_enum is Effects.none:
-                continue
-            if effect_enum in unicode_effects_set:
-                if effect_enum & effects:
-                    active_unicode_effects |= effect_enum
-                continue
-            if effect_enum & effects:
-                sgr_codes.append(effect_map[effect_enum])
-            elif reset and (
-                not effect_enum in effect_double_off
-                or not any(e & effects for e in effect_double_off[effect_enum])
-            ):
-                sgr_codes.append(effect_off_map[effect_enum])
+        sgr_codes, active_unicode_effects = sgr_effects_params(effects, reset, turn_off)
 
         self.active_unicode_effects = active_unicode_effects
         if not update_active_only:
@@ -1,6 +1,8 @@
+from collections import namedtuple
 from inspect import signature
+from operator import attrgetter
 
-from terminedia.utils import V2, HookList, get_current_tick
+from terminedia.utils import V2, HookList, Rect, get_current_tick
 from terminedia.values import EMPTY, FULL_BLOCK, TRANSPARENT, Directions, Color
 from terminedia.utils import combine_signatures, Gradient, ColorGradient
 
@@ -8,11 +10,21 @@ class Transformer:
 
     channels = "pixel char foreground background effects".split()
 
+    #: Incremented whenever a channel is set in any transformer
+    channels_version = 0
+
     for channel in channels:
         locals().__setitem__(channel, None)
     del channel
 
-    def __init__(self, pixel=None, char=None, foreground=None, background=None, effects=None):
+    #: Area affected by the transformer, in the coordinates of the shape or sprite it is applied to.
+    #: None means the whole shape. Used to restrict redraws for transformers using "tick".
+    rect = None
+    #: Number of ticks for which the output of a "tick" using transformer stays the same.
+    #: None means it may change on every tick.
+    period = None
+
+    def __init__(self, pixel=None, char=None, foreground=None, background=None, effects=None, *, rect=None, period=None):
         """
         Class implementing a generic filter to be applied on an shape's pixels when their value is read.
 
@@ -52,8 +64,16 @@ class Transformer:
 
         It should return the value to be used downstream of the named channel.
 
+        Transformers depending on "tick" make their area be redrawn at each frame. The
+        optional "rect" and "period" keyword arguments restrict that to the
+        given area, and to once every "period" ticks.
+
         """
         self.signatures = {}
+        if rect is not None:
+            self.rect = Rect(rect)
+        if period is not None:
+            self.period = period
         for slotname in self.channels:
             # Build signature for channels defined in subclasses:
             self._build_signature(slotname)
@@ -63,6 +83,26 @@ class Transformer:
                     value = Color(value)
                 setattr(self, slotname, value)
 
+    @property
+    def uses_tick(self):
+        return any("tick" in parameters for parameters in self.signatures.values())
+
+    def tick_changed(self, previous_tick, tick):
+        """Whether the transformer output may have changed from previous_tick to tick"""
+        if not self.uses_tick:
+            return False
+        if previous_tick is None:
+            return True
+        period = self.period or 1
+        return tick // period != previous_tick // period
+
+    def row_method(self, channel):
+        """The "<channel>_row(source, pos, length)" method computing a channel for a whole span, if any"""
+        if channel in self.__dict__ and f"{channel}_row" not in self.__dict__:
+            # channel was overriden in the instance - the class row method does not apply
+            return None
+        return getattr(self, f"{channel}_row", None)
+
     def _build_signature(self, channel):
         self.signatures[channel] = frozenset(signature(getattr(self, channel)).parameters.keys()) if callable(getattr(self, channel)) else ()
 
@@ -70,6 +110,8 @@ class Transformer:
         super().__setattr__(attr, value)
         if attr in self.__class__.channels:
             self._build_signature(attr)
+            # Signals compiled pipelines in any container that they are outdated:
+            Transformer.channels_version += 1
 
     def __repr__(self):
         channel_list = []
@@ -94,52 +136,89 @@ class Transformer:
 
 
 class KernelTransformer(Transformer):
+    """Replaces each character according to its 3x3 neighbourhood
+
+    Args:
+      - kernel (Mapping): maps 9 character strings, with the neighbourhood
+            cells, top-down, in which "#" marks a set cell and " " an empty one,
+            to the resulting character. The "default" key, if present,
+            is used for unlisted neighbourhoods.
+      - mask_diags (bool): if set, diagonal neighbours are always considered empty.
+
+    Internally, each neighbourhood is encoded as a 9 bit mask (bit 0 being the top-left cell),
+    and used as an index in a 512 entry table built from the kernel. The table
+    is rebuilt whenever ``kernel`` (including in place changes) or ``mask_diags`` change.
+    """
     policy = "abyss"
 
     def __init__(self, kernel, mask_diags=True, **kwargs):
         self.kernel = kernel
         self.mask_diags = mask_diags
+        self._table_key = None
         super().__init__(**kwargs)
 
-    def kernel_match(self, source, pos):
-        from terminedia.image import ImageShape
-        source_is_image = False
-        if  hasattr(source, "value_data"):
-            data = source.value_data
-            ...
-            # TODO: 'fastpath' made faster for fullshapes
-            value = ...
+    @property
+    def table(self):
+        # A snapshot of the items, rather than the kernel identity, also catches in place changes
+        key = (tuple(self.kernel.items()), self.mask_diags)
+        if key != self._table_key:
+            keep = 0b010111010 if self.mask_diags else 0b111111111
+            default = self.kernel.get("default", " ")
+            self._table = [
+                self.kernel.get("".join("#" if mask & keep & (1 << bit) else " " for bit in range(9)), default)
+                for mask in range(512)
+            ]
+            self._table_key = key
+        return self._table
+
+    def _filled_row(self, source, y, start, stop):
+        """Flags for each cell in a row span that are set, zero for out of bounds positions"""
+        from terminedia.image import ImageShape, FullShape
+        if self.policy != "abyss":
+            raise NotImplementedError(f"Out of bound policy not implemented: {self.policy}")
+        if not 0 <= y < source.height:
+            return [0] * (stop - start)
+        x0 = max(start, 0)
+        x1 = max(min(stop, source.width), x0)
+        if isinstance(source, FullShape):
+            base = y * source.width
+            cells = source.value_data[base + x0: base + x1]
+            flags = [cell is not TRANSPARENT and cell != EMPTY for cell in cells]
         elif isinstance(source, ImageShape):
-            source_is_image = True
+            background = source.context.background
+            flags = [source.get_raw((x, y)) != background for x in range(x0, x1)]
         else:
-            data = source.data
+            flags = [source.get_raw((x, y)) not in (EMPTY, TRANSPARENT) for x in range(x0, x1)]
+        return [0] * (x0 - start) + flags + [0] * (stop - x1)
 
-        value = ""
+    def kernel_match_row(self, source, pos, length):
+        """Resulting characters for a span of cells starting at pos
 
-        for y in -1, 0, 1:
-            for x in -1, 0, 1:
-                compare_pos = pos + (x, y)
-                offset = source.get_data_offset(compare_pos)
-                if offset is None:
-                    if self.policy == "abyss":
-                        value += " "
-                    else:
-                        raise NotImplementedError("Out of bound policy not implemented: {self.policy}")
-                    continue
-                if self.mask_diags and (x and y):
-                    value += " "
-                    continue
-
-                if source_is_image:
-                    value += "#" if source.get_raw(pos) != source.context.background else " "
-                    continue
-                value += "#" if data[offset] not in (EMPTY, TRANSPARENT) else " "
+        Neighbourhood masks are computed with a sliding window:
+        each new cell only needs the column of 3 flags entering the window.
+        """
+        x0, y = pos
+        top, middle, bottom = (
+            self._filled_row(source, y + dy, x0 - 1, x0 + length + 1) for dy in (-1, 0, 1)
+        )
+        columns = [t | m << 3 | b << 6 for t, m, b in zip(top, middle, bottom)]
+        table = self.table
+        result = []
+        mask = columns[0] << 1 | columns[1] << 2
+        for column in columns[2:]:
+            mask = (mask >> 1) & 0b011011011 | column << 2
+            result.append(table[mask])
+        return result
 
-        return self.kernel.get(value, self.kernel.get("default", " "))
+    def kernel_match(self, source, pos):
+        return self.kernel_match_row(source, pos, 1)[0]
 
     def char(self, source, pos):
         return self.kernel_match(source, pos)
 
+    def char_row(self, source, pos, length):
+        return self.kernel_match_row(source, pos, length)
+
 
 kernel_dilate = {
     "   "\
@@ -205,7 +284,13 @@ class GradientTransformer(Transformer):
         else:
             engine = self._engine
 
-        super().__init__(**{channel: engine})
+        super().__init__(**{channel: engine}, **kwargs)
+
+    def row_method(self, channel):
+        if channel == self.channel and getattr(self, channel) == self._engine:
+            # Whole spans are read from the precomputed table at once:
+            return self._engine_row
+        return super().row_method(channel)
 
     def get_gradient_pos(self, pos, target_size):
         scale_factor = getattr(self.gradient, "scale_factor", 1)
@@ -227,24 +312,141 @@ class GradientTransformer(Transformer):
         return pos / (size - 1)
 
 
-    def _engine(self, source, pos):
-        if self.direction == Directions.RIGHT:
-            gr_pos = self.get_gradient_pos(pos.x, source.width)
-        elif self.direction == Directions.LEFT:
-            gr_pos = 1 - self.get_gradient_pos(pos.x, source.width)
-        elif self.direction == Directions.DOWN:
-            gr_pos = self.get_gradient_pos(pos.y, source.height)
-        elif self.direction == Directions.UP:
-            gr_pos = 1 - self.get_gradient_pos(pos.y, source.height)
+    def _sample(self, axis_pos, length):
+        try:
+            if self.direction == Directions.RIGHT:
+                gr_pos = self.get_gradient_pos(axis_pos, length)
+            elif self.direction == Directions.LEFT:
+                gr_pos = 1 - self.get_gradient_pos(axis_pos, length)
+            elif self.direction == Directions.DOWN:
+                gr_pos = self.get_gradient_pos(axis_pos, length)
+            elif self.direction == Directions.UP:
+                gr_pos = 1 - self.get_gradient_pos(axis_pos, length)
+        except _GradientOutOfRange:
+            return _GradientOutOfRange
 
+        return self._root_gradient()[gr_pos]
+
+    def _root_gradient(self):
         if getattr(self.gradient, "scale_factor", 1) != 1:
-            grad = self.gradient.root
+            return self.gradient.root
+        return self.gradient
+
+    def _get_table(self, length):
+        """Values for each position along the gradient axis, for a target with the given length
+
+        The table is rebuilt if the target length, any of the transformer
+        parameters or the gradient stops change.
+        """
+        key = (
+            length, self.direction, self.repeat, self.offset, self.size,
+            self.gradient, getattr(self._root_gradient(), "generation", None)
+        )
+        if key != self.__dict__.get("_table_key"):
+            self._table = [self._sample(axis_pos, length) for axis_pos in range(length)]
+            self._table_key = key
+        return self._table
+
+    def _engine(self, source, pos):
+        if self.direction in (Directions.RIGHT, Directions.LEFT):
+            axis_pos, length = pos.x, source.width
+        else:
+            axis_pos, length = pos.y, source.height
+        if type(axis_pos) is int and 0 <= axis_pos < length:
+            value = self._get_table(length)[axis_pos]
         else:
-            grad = self.gradient
-        return grad[gr_pos]
+            value = self._sample(axis_pos, length)
+        if value is _GradientOutOfRange:
+            raise _GradientOutOfRange()
+        return value
+
+    def _engine_row(self, source, pos, length):
+        x0, y = pos
+        if self.direction not in (Directions.RIGHT, Directions.LEFT):
+            return [self._engine(source, V2(x0, y))] * length
+        width = source.width
+        table = self._get_table(width)
+        if 0 <= x0 and x0 + length <= width:
+            return table[x0: x0 + length]
+        return [self._engine(source, V2(x, y)) for x in range(x0, x0 + length)]
+
+
+#: Pair of callables returned by TransformersContainer.compile
+CompiledTransformers = namedtuple("CompiledTransformers", "pixel row")
+
+# Attribute names for the channel parameters, as read from the source pixel:
+_pixel_getters = {
+    "char": attrgetter("value"),
+    "foreground": attrgetter("foreground"),
+    "background": attrgetter("background"),
+    "effects": attrgetter("effects"),
+}
+
+_MISSING = object()
+
+
+def _compile_channel(transformer, channel, ch_num, function):
+    """Builds a callable calling a transformer channel with its parameters
+
+    The returned callable has the signature (values, pixel, pos, source, tick)
+    and returns the channel output.
+    """
+    static_args = {}
+    pixel_args = []
+    custom_args = []
+    wants = set()
+    for parameter in transformer.signatures[channel]:
+        if parameter == "self":
+            static_args["self"] = transformer
+        elif parameter in _pixel_getters:
+            pixel_args.append((parameter, _pixel_getters[parameter]))
+        elif parameter in ("value", "pos", "pixel", "source", "tick", "context"):
+            wants.add(parameter)
+        else:
+            # Allows for custom parameters that can be made available
+            # for specific uses of transformers.
+            # (ex.: 'sequence_index' for transformers inlined in rich-text rendering)
+            custom_args.append(parameter)
+
+    if not pixel_args and not wants and not custom_args:
+        return lambda values, pixel, pos, source, tick: function(**static_args)
+
+    wants_value = "value" in wants
+    wants_pos = "pos" in wants
+    wants_pixel = "pixel" in wants
+    wants_source = "source" in wants
+    wants_tick = "tick" in wants
+    wants_context = "context" in wants
+
+    def call(values, pixel, pos, source, tick):
+        args = static_args.copy()
+        for parameter, getter in pixel_args:
+            args[parameter] = getter(pixel)
+        if wants_value:
+            args["value"] = values[ch_num]
+        if wants_pos:
+            args["pos"] = pos
+        if wants_pixel:
+            args["pixel"] = pixel
+        if wants_source:
+            args["source"] = source
+        if wants_tick:
+            args["tick"] = tick
+        if wants_context:
+            args["context"] = source.context
+        for parameter in custom_args:
+            value = getattr(transformer, parameter, _MISSING)
+            if value is not _MISSING:
+                args[parameter] = value
+        return function(**args)
+
+    return call
 
 
 class TransformersContainer(HookList):
+    _compiled = None
+    _compiled_version = None
+
     def __init__(self, *args):
         super().__init__(*args)
 
@@ -255,46 +457,39 @@ class TransformersContainer(HookList):
         if not isinstance(item, Transformer):
             raise TypeError("Only Transformer instances can be added to a TransformersContainer")
         item.container = self
+        self.invalidate()
         return item
 
-    def process(self, source, pos, pixel):
-        """Called automatically by FullShape.__getitem__
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self.invalidate()
 
-        Only implemented for pixels with all attributes (used by fullshape)
+    def invalidate(self):
+        """Discards the compiled pipeline - called automatically when transformers change"""
+        self._compiled = None
+
+    def compile(self):
+        """Builds callables applying all transformers in the container
+
+        The signature of each transformer channel is inspected once,
+        and the argument building is specialized for the parameters it actually uses.
+        The result is cached until a transformer is added, removed or has
+        one of its channels changed.
+
+        Returns a ``CompiledTransformers`` pair of callables:
+          - pixel(source, pos, pixel) -> transformed pixel
+          - row(source, pos, row) -> transformed row, with the same arguments
+                and return value as :any:`TransformersContainer.process_row`
         """
-        pcls = type(pixel)
-        values = list(pixel)
-
-        def build_args(channel, signature):
-            nonlocal transformer, pixel, values, ch_num
-            args = {}
-            for parameter in signature:
-                if parameter == "self":
-                    args["self"] = transformer
-                elif parameter == "value":
-                    args["value"] = values[ch_num]
-                elif parameter in Transformer.channels and parameter != "pixel":
-                    args[parameter] = getattr(pixel, parameter if parameter != "char" else "value")
-                elif parameter == "pos":
-                    args["pos"] = V2(pos)
-                elif parameter == "pixel":
-                    args["pixel"] = pixel
-                elif parameter == "source":
-                    args["source"] = source
-                elif parameter == "tick":
-                    args["tick"] = get_current_tick()
-                elif parameter == "context":
-                    args["context"] = source.context
-                elif hasattr(transformer, parameter):
-                    # Allows for custom parameters that can be made available
-                    # for specific uses of transformers.
-                    # (ex.: 'sequence_index' for transformers inlined in rich-text rendering)
-                    args[parameter] = getattr(transformer, parameter)
-            return args
-
-        values = list(pixel)
+        if self._compiled is not None and self._compiled_version == Transformer.channels_version:
+            return self._compiled
+        self._compiled_version = Transformer.channels_version
+
+        steps = []
+        row_channels = []
+        wants_pos = wants_tick = wants_pixel = False
         for transformer in self.stack:
-            dest_values = values[:]
+            step = []
             for ch_num, channel in enumerate(Transformer.channels, -1):
                 transformer_channel = getattr(transformer, channel, None)
                 if transformer_channel is None:
@@ -302,17 +497,91 @@ class TransformersContainer(HookList):
                 if not callable(transformer_channel):
                     if ch_num == -1:  # (pixel channel)
                         continue
-                    dest_values[ch_num] = transformer_channel
+                    step.append((ch_num, False, transformer_channel, None))
                     continue
-                params = build_args(transformer_channel, transformer.signatures[channel])
-                if ch_num == -1:  # (pixel channel)
-                    dest_values = list(transformer_channel(**params))
+                # Transformer classes can provide a "<channel>_row(source, pos, length)" method
+                # computing the channel for a whole span at once, from the source data only.
+                row_channel = transformer.row_method(channel)
+                if row_channel is not None:
+                    row_slot = len(row_channels)
+                    row_channels.append(row_channel)
                 else:
-                    dest_values[ch_num] = transformer_channel(**params)
-            values = dest_values
+                    row_slot = None
+                parameters = transformer.signatures[channel]
+                wants_tick = wants_tick or "tick" in parameters
+                if row_channel is None:
+                    wants_pos = wants_pos or "pos" in parameters
+                    wants_pixel = wants_pixel or bool(
+                        {"pixel", "char", "foreground", "background", "effects"} & set(parameters)
+                    )
+                step.append((ch_num, True, _compile_channel(transformer, channel, ch_num, transformer_channel), row_slot))
+            if step:
+                steps.append(step)
+
+        def apply(values, pixel, pos, source, tick, index=0, row_values=None):
+            for step in steps:
+                dest_values = values[:]
+                for ch_num, is_callable, channel, row_slot in step:
+                    if not is_callable:
+                        dest_values[ch_num] = channel
+                        continue
+                    if row_slot is not None and row_values is not None:
+                        value = row_values[row_slot][index]
+                    else:
+                        value = channel(values, pixel, pos, source, tick)
+                    if ch_num == -1:  # (pixel channel)
+                        dest_values = list(value)
+                    else:
+                        dest_values[ch_num] = value
+                values = dest_values
+            return values
+
+        def process_pixel(source, pos, pixel):
+            tick = get_current_tick() if wants_tick else None
+            return type(pixel)(*apply(list(pixel), pixel, V2(pos), source, tick))
+
+        def process_row(source, pos, row):
+            pcls = source.PixelCls
+            x0, y = pos
+            tick = get_current_tick() if wants_tick else None
+            length = len(row[0])
+            row_values = [row_channel(source, V2(x0, y), length) for row_channel in row_channels]
+            results = []
+            for index, values in enumerate(zip(*row)):
+                results.append(apply(
+                    list(values),
+                    pcls(*values) if wants_pixel else None,
+                    V2(x0 + index, y) if wants_pos else None,
+                    source,
+                    tick,
+                    index,
+                    row_values
+                ))
+            if not results:
+                return list(row)
+            return [list(channel) for channel in zip(*results)]
+
+        self._compiled = CompiledTransformers(process_pixel, process_row)
+        return self._compiled
+
+    def process(self, source, pos, pixel):
+        """Called automatically by FullShape.__getitem__
+
+        Only implemented for pixels with all attributes (used by fullshape)
+        """
+        return self.compile().pixel(source, pos, pixel)
+
+    def process_row(self, source, pos, row):
+        """Called automatically by FullShape.get_row
 
-        pixel = pcls(*values)
-        return pixel
+        Args:
+          - source: shape being read
+          - pos: position of the first pixel in the span
+          - row: sequence of lists, one per pixel channel, as returned by ``Shape.get_row``
+
+        Returns a list with the transformed channel lists.
+        """
+        return self.compile().row(source, pos, row)
 
     def bake(self, shape, target=None, offset=(0, 0)):
         """Apply the transformation stack for each pixel in the given shape
@@ -339,11 +608,16 @@ class TransformersContainer(HookList):
         # if target is shape, bad things will happen for some transformers - specially Kernel based transforms
 
         offset = V2(offset)
-        for pos, pixel in source:
-            target[pos + offset] = self.process(source, pos, pixel)
+        process_row = self.compile().row
+        pcls = source.PixelCls
+        for y in range(source.height):
+            row = process_row(source, V2(0, y), source.get_row(y))
+            for x, values in enumerate(zip(*row)):
+                target[offset + (x, y)] = pcls(*values)
         return target
 
     def remove(self, tr):
         # override default remove for a safe "pass if not exist" (and faster)
         if tr in self.data:
             self.data.remove(tr)
+            self.invalidate()
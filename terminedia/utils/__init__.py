@@ -10,10 +10,14 @@ from .collections import (
     HookList,
     TaggedDict,
     LazyDict,
+    PackedPlane,
+    PackedCharPlane,
+    PackedColorPlane,
+    InternedPlane,
 )
 from .descriptors import LazyBindProperty, ObservableProperty
 from .vector import V2, NamedV2
-from .rect import Rect
+from .rect import Rect, DirtyRegion
 from .colors import css_colors, Color, SpecialColor
 from .gradient import Gradient, EPSILON, ColorGradient
 
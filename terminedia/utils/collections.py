@@ -1,4 +1,5 @@
 import threading
+from array import array
 
 from collections.abc import MutableSequence, MutableMapping, Iterable, Mapping
 from copy import copy
@@ -275,3 +276,161 @@ class Grapheme2DArray:
 
     def __repr__(self):
         return f"{self.__class__.__name__}({tuple(self.size)!r})"
+
+
+class PackedPlane(MutableSequence):
+    """Base for flat, fixed-typecode, sequences used as storage planes in Shapes
+
+    Values are kept encoded as integers in an ``array.array`` - subclasses
+    implement ``encode`` and ``decode`` to convert values to and from
+    their integer representation. Reading and writing works as in a list
+    (including slices), so these can be used as drop-in replacement
+    for the list planes in ``FullShape``.
+
+    The ``data`` attribute is the raw array, and can be used directly
+    to copy spans among planes of the same class.
+    """
+
+    typecode = "I"
+
+    def __init__(self, initial=()):
+        # Encoding is done before the array is created, as it might change the typecode
+        codes = [self.encode(value) for value in initial]
+        self.data = array(self.typecode, codes)
+
+    def encode(self, value):
+        raise NotImplementedError()
+
+    def decode(self, code):
+        raise NotImplementedError()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.decode(code) for code in self.data[index]]
+        return self.decode(self.data[index])
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            codes = [self.encode(item) for item in value]
+            self.data[index] = array(self.typecode, codes)
+            return
+        self.data[index] = self.encode(value)
+
+    def __delitem__(self, index):
+        del self.data[index]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return map(self.decode, self.data)
+
+    def insert(self, index, value):
+        self.data.insert(index, self.encode(value))
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(<{len(self)} items>)"
+
+
+#: First code used for values stored out of the unicode codepoint range
+#: in a PackedCharPlane
+_CHAR_EXTRA_BASE = 0x110000
+
+
+class PackedCharPlane(PackedPlane):
+    """Plane of single-cell characters stored as unicode code points
+
+    Values that are not a single codepoint - the CONTINUATION and
+    TRANSPARENT markers, or a character with combining marks - are
+    interned in a per-plane table and stored with a code above 0x10FFFF.
+    """
+
+    def __init__(self, initial=()):
+        from terminedia.values import CONTINUATION, TRANSPARENT
+
+        self.extra = [CONTINUATION, TRANSPARENT]
+        self.extra_index = {CONTINUATION: 0}
+        self._transparent = TRANSPARENT
+        super().__init__(initial)
+
+    def encode(self, value):
+        if isinstance(value, str) and len(value) == 1:
+            return ord(value)
+        if value is self._transparent:
+            return _CHAR_EXTRA_BASE + 1
+        code = self.extra_index.get(value)
+        if code is None:
+            code = self.extra_index[value] = len(self.extra)
+            self.extra.append(value)
+        return _CHAR_EXTRA_BASE + code
+
+    def decode(self, code):
+        if code < _CHAR_EXTRA_BASE:
+            return chr(code)
+        return self.extra[code - _CHAR_EXTRA_BASE]
+
+
+class PackedColorPlane(PackedPlane):
+    """Plane of colors stored as 32bit integers
+
+    Uses the encoding in ``Color.packed``: RGB in the lower 24 bits,
+    or a flag bit plus an index for the special colors (DEFAULT_FG, TRANSPARENT, etc...).
+    Decoded colors are cached in the plane, so the same Color instance
+    is returned for cells with the same value - just like cells
+    painted with the same context color share the instance in list-based planes.
+    """
+
+    def __init__(self, initial=()):
+        from terminedia.utils.colors import Color
+
+        self._color_cls = Color
+        self._decoded = {}
+        super().__init__(initial)
+
+    def encode(self, value):
+        if not isinstance(value, self._color_cls):
+            value = self._color_cls(value)
+        return value.packed
+
+    def decode(self, code):
+        color = self._decoded.get(code)
+        if color is None:
+            color = self._decoded[code] = self._color_cls.from_packed(code)
+        return color
+
+
+class InternedPlane(PackedPlane):
+    """Plane for values with few distinct occurrences, like text effects
+
+    Each distinct value is stored once in the ``values`` table, and cells
+    hold a one byte index to it. If more than 256 distinct values
+    are ever stored, the storage is transparently upgraded to 2-byte indexes.
+    """
+
+    typecode = "B"
+
+    def __init__(self, initial=()):
+        self.values = []
+        self.values_index = {}
+        super().__init__(initial)
+
+    def encode(self, value):
+        try:
+            code = self.values_index.get(value)
+        except TypeError:
+            # unhashable values (like the special color TRANSPARENT) are looked up by identity
+            code = next((i for i, item in enumerate(self.values) if item is value), None)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            try:
+                self.values_index[value] = code
+            except TypeError:
+                pass
+            if code == 256 and self.typecode == "B":
+                self.typecode = "H"
+                self.data = array("H", getattr(self, "data", ()))
+        return code
+
+    def decode(self, code):
+        return self.values[code]
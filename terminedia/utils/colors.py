@@ -2,6 +2,8 @@ import math
 import numbers
 import typing as T
 
+from array import array
+
 from colorsys import rgb_to_hsv, hsv_to_rgb
 
 css_colors = {
@@ -26,6 +28,14 @@ css_colors = {
 
 _colors_cache = {}
 
+#: Bit set on packed color integers that refer to a special color
+#: (see ``Color.packed``) instead of carrying RGB components.
+PACKED_SPECIAL_FLAG = 1 << 24
+
+#: SpecialColor instances, in creation order - the position in this list
+#: is the value used for those colors when packed into an integer.
+_special_colors = []
+
 
 class _ComponentDescriptor:
     def __init__(self, position):
@@ -195,6 +205,22 @@ class Color:
     def html(self):
         return "#{:02X}{:02X}{:02X}".format(*(self.components))
 
+    @property
+    def packed(self):
+        """Color RGB components packed in a single 24bit integer (0xRRGGBB)"""
+        r, g, b = self._components[:3]
+        return (r << 16) | (g << 8) | b
+
+    @classmethod
+    def from_packed(cls, value):
+        """Rebuilds a color from an integer generated by the ``.packed`` property
+
+        Special colors (like DEFAULT_FG or TRANSPARENT) are returned as the singleton instances.
+        """
+        if value & PACKED_SPECIAL_FLAG:
+            return _special_colors[value & 0xffff]
+        return cls(((value >> 16) & 0xff, (value >> 8) & 0xff, value & 0xff))
+
     def __repr__(self):
         value = (
             self.special
@@ -245,11 +271,17 @@ class SpecialColor(Color):
         self.special = value
         self.name = value
         self.component_source = component_source
+        if self not in _special_colors:
+            _special_colors.append(self)
         # no super call.
 
     def __eq__(self, other):
         return other is self
 
+    @property
+    def packed(self):
+        return PACKED_SPECIAL_FLAG | _special_colors.index(self)
+
     @property
     def components(self):
         if not self.component_source:
@@ -259,6 +291,74 @@ class SpecialColor(Color):
         return self.component_source
 
 
+#: RGB values of the 16 basic terminal colors, as used by xterm
+ansi_16_palette = [
+    (0, 0, 0), (205, 0, 0), (0, 205, 0), (205, 205, 0),
+    (0, 0, 238), (205, 0, 205), (0, 205, 205), (229, 229, 229),
+    (127, 127, 127), (255, 0, 0), (0, 255, 0), (255, 255, 0),
+    (92, 92, 255), (255, 0, 255), (0, 255, 255), (255, 255, 255),
+]
+
+_cube_levels = (0, 95, 135, 175, 215, 255)
+
+#: RGB values of the 256 color terminal palette
+ansi_256_palette = ansi_16_palette + [
+    (_cube_levels[i // 36], _cube_levels[i // 6 % 6], _cube_levels[i % 6]) for i in range(216)
+] + [(8 + 10 * i,) * 3 for i in range(24)]
+
+#: Lookup tables from 15 bit colors (5 bits per channel) to palette indexes,
+#: per color depth. Entries are filled on first use: -1 stands for "not computed".
+_palette_luts = {}
+
+
+def _nearest(components, candidates):
+    r, g, b = components
+    return min(
+        candidates,
+        key=lambda item: (item[1][0] - r) ** 2 + (item[1][1] - g) ** 2 + (item[1][2] - b) ** 2
+    )[0]
+
+
+def _nearest_256(components):
+    # Only the closest color cube entry and the closest gray level are candidates:
+    # the first 16 colors can be redefined by the user, and are not used.
+    cube = tuple(min(range(6), key=lambda i: abs(_cube_levels[i] - c)) for c in components)
+    gray = min(max((sum(components) // 3 - 3) // 10, 0), 23)
+    return _nearest(components, [
+        (16 + 36 * cube[0] + 6 * cube[1] + cube[2], tuple(_cube_levels[i] for i in cube)),
+        (232 + gray, ansi_256_palette[232 + gray]),
+    ])
+
+
+def palette_index(packed, depth):
+    """Index of the palette color closest to a RGB color
+
+    Args:
+      - packed (int): RGB color as given by ``Color.packed``
+      - depth (int): 8 for the 256 color palette, 4 for the 16 basic colors.
+
+    Colors are quantized to 5 bits per channel, and the results
+    are cached in a 32768-entry lookup table for each depth.
+    """
+    key = ((packed >> 9) & 0x7c00) | ((packed >> 6) & 0x3e0) | ((packed >> 3) & 0x1f)
+    try:
+        lut = _palette_luts[depth]
+    except KeyError:
+        if depth not in (4, 8):
+            raise ValueError(f"Palette color depth must be 4 or 8, not {depth!r}")
+        lut = _palette_luts[depth] = array("h", [-1]) * 0x8000
+    index = lut[key]
+    if index < 0:
+        # Middle of the 8-value range each 5 bit component stands for
+        components = tuple(((key >> shift) & 0x1f) << 3 | 4 for shift in (10, 5, 0))
+        if depth == 8:
+            index = _nearest_256(components)
+        else:
+            index = _nearest(components, enumerate(ansi_16_palette))
+        lut[key] = index
+    return index
+
+
 class Gradient:
     def __init__(self, stops):
         """Define a gradient.
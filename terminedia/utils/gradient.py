@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import typing as T
+from bisect import bisect_left
 
 from .colors import Color
 
@@ -35,20 +36,36 @@ class Gradient:
         # "root" gradients are always 0-1 range. Use the .scale method to get
         # a child gradient that stretches from 0 to the scale factor.
         self.scale_factor = 1
+        self._generation = 0
+
+    @property
+    def generation(self):
+        """Counter incremented whenever stops are set, shared by scaled gradients
+
+        Can be used by consumers to invalidate values sampled from the gradient.
+        """
+        return self.root._generation
+
+    def _stop_positions(self):
+        stops = self.stops
+        key = (id(stops), len(stops), self.generation)
+        if self.__dict__.get("_positions_key") != key:
+            self._positions = [stop[0] for stop in stops]
+            self._positions_key = key
+        return self._positions
 
     def __getitem__(self, position):
         position /= self.scale_factor
-        p_previous = -1
-        c_previous = self.stops[0][1]
-        for p_start, c_next, *_ in self.stops:
-            if p_previous < position <= p_start:
-                break
-            p_previous = p_start
-            c_previous = c_next
-        else:
-            return c_next
-        if p_previous == -1 or p_start == p_previous:
+        stops = self.stops
+        if position <= -1:
+            return stops[-1][1]
+        index = bisect_left(self._stop_positions(), position)
+        if index == len(stops):
+            return stops[-1][1]
+        p_start, c_next, *_ = stops[index]
+        if index == 0:
             return c_next
+        p_previous, c_previous, *_ = stops[index - 1]
 
         # Linear color segments - in the future we can use a curve function;
         scale = 1 / (p_start - p_previous)
@@ -68,6 +85,7 @@ class Gradient:
             value = self.BASE_TYPE(value)
 
         position /= self.scale_factor
+        self.root._generation += 1
 
         for i, (p_start, *_) in enumerate(self.stops):
             if p_start == position:
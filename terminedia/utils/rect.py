@@ -1,3 +1,6 @@
+from itertools import groupby
+from operator import itemgetter
+
 from .vector import V2
 
 
@@ -270,3 +273,114 @@ class Rect:
 
     def __repr__(self):
         return f"{self.__class__.__name__}({tuple(self.c1)}, {tuple(self.c2)})"
+
+
+class DirtyRegion:
+    """Tracks changed areas of a 2D surface in a bitmap of square tiles
+
+    Marking pixels, horizontal spans or rectangles as changed just sets
+    the corresponding tile flags, and the changed area can be retrieved
+    as a small set of non-overlapping rectangles: adjacent tiles in a row
+    are merged in horizontal runs, and runs spanning the same columns
+    in consecutive tile rows are merged together.
+
+    Args:
+      - size (2-sequence): width and height of the tracked surface
+      - tile_size (int): side of the square tiles, in pixels. Use 1 for per-pixel precision.
+    """
+
+    __slots__ = ("size", "tile_size", "tiles_width", "tiles_height", "bitmap")
+
+    def __init__(self, size, tile_size=8):
+        self.size = V2(size)
+        self.tile_size = tile_size
+        self.tiles_width = -(-self.size.x // tile_size)
+        self.tiles_height = -(-self.size.y // tile_size)
+        self.bitmap = bytearray(self.tiles_width * self.tiles_height)
+
+    def clear(self):
+        self.bitmap[:] = bytes(len(self.bitmap))
+
+    def set_all(self):
+        self.bitmap[:] = b"\x01" * len(self.bitmap)
+
+    def mark_pixel(self, pos):
+        x, y = pos
+        if 0 <= x < self.size.x and 0 <= y < self.size.y:
+            self.bitmap[y // self.tile_size * self.tiles_width + x // self.tile_size] = 1
+
+    def mark_span(self, y, x0, x1):
+        """Marks pixels from x0 up to (excluding) x1 in row y as changed"""
+        x0 = max(x0, 0)
+        x1 = min(x1, self.size.x)
+        if not (0 <= y < self.size.y) or x1 <= x0:
+            return
+        ts = self.tile_size
+        base = y // ts * self.tiles_width
+        t0 = x0 // ts
+        t1 = (x1 - 1) // ts + 1
+        self.bitmap[base + t0: base + t1] = b"\x01" * (t1 - t0)
+
+    def mark_rect(self, rect):
+        if not isinstance(rect, Rect):
+            rect = Rect(rect)
+        ts = self.tile_size
+        y0 = max(rect.top, 0)
+        y1 = min(rect.bottom, self.size.y)
+        x0 = max(rect.left, 0)
+        x1 = min(rect.right, self.size.x)
+        if y1 <= y0 or x1 <= x0:
+            return
+        t0 = x0 // ts
+        t1 = (x1 - 1) // ts + 1
+        run = b"\x01" * (t1 - t0)
+        for base in range(y0 // ts * self.tiles_width, ((y1 - 1) // ts + 1) * self.tiles_width, self.tiles_width):
+            self.bitmap[base + t0: base + t1] = run
+
+    def runs(self):
+        """Yields (tile_row, first_tile, end_tile) tuples for each horizontal run of changed tiles"""
+        bitmap = self.bitmap
+        tw = self.tiles_width
+        for ty in range(self.tiles_height):
+            row_end = (ty + 1) * tw
+            start = bitmap.find(1, ty * tw, row_end)
+            while start != -1:
+                end = bitmap.find(0, start, row_end)
+                if end == -1:
+                    end = row_end
+                yield ty, start - ty * tw, end - ty * tw
+                start = bitmap.find(1, end, row_end)
+
+    def rects(self):
+        """Returns a list of non-overlapping Rects covering all changed tiles, in top-down order"""
+        result = []
+        # (first_tile, end_tile) -> (first_row, end_row) for runs present in the last processed row
+        open_runs = {}
+        for ty, row_runs in groupby(self.runs(), key=itemgetter(0)):
+            extended = {}
+            for _, t0, t1 in row_runs:
+                first_row, end_row = open_runs.pop((t0, t1), (ty, ty))
+                if end_row != ty:
+                    result.append(self._tiles_to_rect(t0, t1, first_row, end_row))
+                    first_row = ty
+                extended[t0, t1] = (first_row, ty + 1)
+            for (t0, t1), (first_row, end_row) in open_runs.items():
+                result.append(self._tiles_to_rect(t0, t1, first_row, end_row))
+            open_runs = extended
+        for (t0, t1), (first_row, end_row) in open_runs.items():
+            result.append(self._tiles_to_rect(t0, t1, first_row, end_row))
+        result.sort(key=lambda rect: (rect.top, rect.left))
+        return result
+
+    def _tiles_to_rect(self, t0, t1, first_row, end_row):
+        ts = self.tile_size
+        return Rect(
+            t0 * ts, first_row * ts,
+            min(t1 * ts, self.size.x), min(end_row * ts, self.size.y)
+        )
+
+    def __bool__(self):
+        return 1 in self.bitmap
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({tuple(self.size)}, tile_size={self.tile_size}, rects={self.rects()})"
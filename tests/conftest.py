@@ -1,4 +1,5 @@
 import io
+import re
 from unittest import mock
 
 import terminedia as TM
@@ -39,6 +40,52 @@ fast_render_mark = (
 )
 
 
+def virtual_terminal_feed(screen, text, cursor):
+    """Minimal interpreter for the cursor movements issued by the ANSI backend"""
+    width = len(screen[0])
+    pos = 0
+    last_char = None
+    pattern = re.compile(r"\x1b\[([0-9;?]*)([a-zA-Z])")
+    while pos < len(text):
+        match = pattern.match(text, pos)
+        if match:
+            args, command = match.groups()
+            numbers = [int(arg) for arg in args.split(";") if arg.isdigit()]
+            amount = numbers[0] if numbers else 1
+            x, y = cursor
+            if command == "H":
+                cursor = [numbers[1] - 1, numbers[0] - 1]
+            elif command == "G":
+                cursor = [amount - 1, y]
+            elif command == "C":
+                cursor = [min(x, width - 1) + amount, y]
+            elif command == "D":
+                cursor = [min(x, width - 1) - amount, y]
+            elif command == "A":
+                cursor = [min(x, width - 1), y - amount]
+            elif command == "B":
+                cursor = [min(x, width - 1), y + amount]
+            elif command == "b":
+                for i in range(amount):
+                    screen[y][x + i] = last_char
+                cursor = [x + amount, y]
+            elif command == "X":
+                for i in range(amount):
+                    screen[y][x + i] = " "
+            pos = match.end()
+            continue
+        char = text[pos]
+        if char == "\r":
+            cursor = [0, cursor[1]]
+        elif char == "\n":
+            cursor = [cursor[0], cursor[1] + 1]
+        else:
+            screen[cursor[1]][cursor[0]] = last_char = char
+            cursor = [cursor[0] + 1, cursor[1]]
+        pos += 1
+    return cursor
+
+
 def rendering_test(func):
     @combine_signatures(func)
     def rendering_test(*args, set_render_method, DISPLAY, DELAY, **kwargs):
@@ -0,0 +1,75 @@
+import os
+import socket
+import tempfile
+
+import terminedia as TM
+from terminedia.broadcast import Broadcaster
+
+from conftest import virtual_terminal_feed
+
+
+def _receive(sock):
+    data = b""
+    sock.settimeout(0.5)
+    while True:
+        try:
+            chunk = sock.recv(65536)
+        except socket.timeout:
+            break
+        data += chunk
+        if len(chunk) < 65536:
+            break
+    return data.decode("utf-8")
+
+
+def _displayed(terminal):
+    return ["".join(row) for row in terminal]
+
+
+def test_broadcaster_sends_full_frame_to_late_joiners_and_deltas_to_others():
+    shape = TM.shape((12, 3))
+    shape.draw.line((0, 1), (11, 1), char="=")
+    broadcaster = Broadcaster(shape)
+    server_side, first = socket.socketpair()
+    broadcaster.add_client(server_side)
+    assert broadcaster.broadcast() == 1
+    terminal = [[" "] * 12 for _ in range(3)]
+    cursor = virtual_terminal_feed(terminal, _receive(first).replace("\x1b[0m\x1b[2J", ""), [0, 0])
+    expected = ["".join(shape.get_row(y)[0]) for y in range(3)]
+    assert _displayed(terminal) == expected
+
+    shape[3, 2] = "*"
+    server_side, second = socket.socketpair()
+    broadcaster.add_client(server_side, color_depth=8)
+    assert broadcaster.broadcast(rects=[TM.Rect((3, 2), (4, 3))]) == 2
+    delta = _receive(first)
+    assert "=" not in delta and "*" in delta
+    cursor = virtual_terminal_feed(terminal, delta, cursor)
+    expected = ["".join(shape.get_row(y)[0]) for y in range(3)]
+    assert _displayed(terminal) == expected
+
+    late = _receive(second)
+    assert late.startswith("\x1b[0m\x1b[2J") and "=" * 12 in late
+
+    first.close()
+    shape[4, 2] = "+"
+    broadcaster.broadcast()
+    broadcaster.broadcast()
+    assert len(broadcaster.clients) == 1
+    broadcaster.close()
+
+
+def test_broadcaster_accepts_connections_on_unix_socket():
+    shape = TM.shape((4, 1))
+    shape[0, 0] = "@"
+    broadcaster = Broadcaster(shape)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "screen.sock")
+        broadcaster.listen(path)
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(path)
+        assert broadcaster.broadcast() == 1
+        assert "@" in _receive(client)
+        client.close()
+        broadcaster.close()
+        assert not os.path.exists(path)
@@ -113,3 +113,14 @@ def test_colors_isclose():
     assert a.isclose((0, 2, 2))
     assert not a.isclose((0, 2, 4))
     assert a.isclose((0, 2, 4), abs_tol=10)
+
+def test_palette_index_maps_to_closest_palette_color():
+    from terminedia.utils.colors import palette_index
+
+    assert palette_index(Color("red").packed, 8) == 196
+    assert palette_index(Color((0, 0, 0)).packed, 8) == 16
+    assert palette_index(Color((118, 118, 118)).packed, 8) == 243
+    assert palette_index(Color((255, 255, 255)).packed, 4) == 15
+    assert palette_index(Color((200, 10, 0)).packed, 4) == 1
+    # Colors sharing the 5 most significant bits per channel share an entry
+    assert palette_index(Color((100, 150, 200)).packed, 8) == palette_index(Color((103, 145, 207)).packed, 8)
@@ -0,0 +1,141 @@
+import io
+import json
+import re
+from unittest import mock
+
+import terminedia as TM
+from terminedia.html import HTMLEncoder, css_style, patch_viewer
+from terminedia.values import DEFAULT_BG, DEFAULT_FG, Effects
+
+
+def test_css_style_leaves_default_colors_out():
+    assert css_style(DEFAULT_FG, DEFAULT_BG, Effects.none) == ""
+    assert css_style(TM.Color("red"), DEFAULT_BG, Effects.underline | Effects.bold) == (
+        "color: #FF0000; font-weight: bold; text-decoration: underline"
+    )
+    assert "background: #FF0000" in css_style(TM.Color("red"), DEFAULT_BG, Effects.reverse)
+
+
+def test_html_encoder_interns_classes_and_merges_runs():
+    shape = TM.shape((10, 2))
+    shape.context.color = TM.Color("red")
+    shape.draw.line((0, 0), (3, 0), char="#")
+    shape.draw.line((0, 1), (3, 1), char="<")
+    shape.context.color = TM.Color("blue")
+    shape[5, 0] = "*"
+    encoder = HTMLEncoder()
+    rows = [encoder.encode_row(*shape.get_row(y)) for y in range(2)]
+    assert rows[0] == '<span class="tm0">####</span> <span class="tm1">*</span>    '
+    assert rows[1] == '<span class="tm0">&lt;&lt;&lt;&lt;</span>      '
+    assert encoder.styles == {"tm0": "color: #FF0000", "tm1": "color: #0000FF"}
+
+
+def test_shape_render_html_streams_rows_and_stylesheet():
+    shape = TM.shape((200, 60))
+    shape.context.color = TM.Color("yellow")
+    shape.draw.rect((0, 0, 200, 60))
+    output = io.StringIO()
+    shape.render(output, backend="HTML")
+    html = output.getvalue()
+    content = html[html.index("<pre"): html.index("</pre>")].split("\n")[1:-1]
+    assert len(content) == 60
+    assert len(re.sub("<[^>]*>", "", content[1])) == 200
+    assert ".tm0 {color: #FFFF00}" in html
+    assert html.index("</pre>") < html.index("<style>")
+    assert len(html) < 20_000
+
+
+def _apply_patch(rows, patch):
+    width, height = patch["size"]
+    while len(rows) < height:
+        rows.append([" "] * width)
+    for y, x0, x1, runs in patch["rows"]:
+        x = x0
+        for name, text in runs:
+            for cell in text:
+                rows[y][x] = cell
+                x += 1
+        assert x == x1
+
+
+def test_html_fast_render_emits_patches_for_changed_areas():
+    previous = getattr(TM.context, "fast_render", False)
+    TM.context.fast_render = True
+    sc = TM.Screen((20, 4), backend="html")
+    output = io.StringIO()
+    try:
+        with mock.patch("sys.stdout", output):
+            sc.data.context.color = TM.Color("red")
+            sc.data.draw.line((0, 1), (9, 1), char="=")
+            sc.update()
+            sc.data.context.color = TM.Color("green")
+            sc.data[15, 3] = "*"
+            sc.update()
+    finally:
+        TM.context.fast_render = previous
+    frames = [json.loads(line) for line in output.getvalue().splitlines()]
+    first, last = frames[-2:]
+    assert first["styles"] == {"tm0": "color: #FF0000"}
+    assert last["styles"] == {"tm1": "color: #008000"}
+    # Only the dirty tiles around the changed cell are sent
+    assert all(x0 > 0 for y, x0, x1, runs in last["rows"])
+    assert ["tm1", "*"] in last["rows"][-1][3]
+    rows = []
+    for frame in frames:
+        _apply_patch(rows, frame)
+    expected = ["".join(sc.data.get_row(y)[0]) for y in range(4)]
+    assert ["".join(row) for row in rows] == expected
+
+
+def test_html_fast_render_sends_one_item_per_column_for_double_width_characters():
+    shape = TM.shape((4, 1))
+    shape[0, 0] = "試"
+    commands = TM.html.HTMLCommands()
+    output = io.StringIO()
+    commands.fast_render(shape, file=output)
+    patch = json.loads(output.getvalue())
+    assert patch["rows"] == [[0, 0, 4, [[None, ["試", "", " ", " "]]]]]
+
+
+def test_patch_viewer_embeds_frames_and_source():
+    page = patch_viewer("frames.jsonl", ['{"size":[1,1],"rows":[[0,0,1,[[null,"<"]]]]}'])
+    assert '"frames.jsonl"' in page
+    assert '[{"size": [1, 1], "rows": [[0, 0, 1, [[null, "<"]]]]}].forEach(applyPatch)' in page
+    assert "{source}" not in page and "{frames}" not in page
+
+
+def test_shape_render_html_works_for_paletted_shapes():
+    shape = TM.shape(["ab", "cd"], color_map={"a": TM.Color("red")})
+    html = shape.render(backend="HTML")
+    content = html[html.index("<pre"): html.index("</pre>")].split("\n")[1:-1]
+    # Paletted shapes are drawn with the context character, as on a Screen
+    expected = TM.FullShape.promote(shape)
+    assert [re.sub("<[^>]*>", "", row) for row in content] == [
+        "".join(expected.get_row(y)[0]) for y in range(2)
+    ]
+    assert "color: #FF0000" in html
+
+
+def test_html_fast_render_direct_writes_are_sent_as_patches():
+    previous = getattr(TM.context, "fast_render", False)
+    TM.context.fast_render = True
+    sc = TM.Screen((20, 4), backend="html")
+    output = io.StringIO()
+    try:
+        with mock.patch("sys.stdout", output):
+            sc.draw.line((0, 1), (9, 1), char="=")
+            sc.update()
+            sc[15, 3] = "*"
+            sc.draw.line((0, 2), (3, 2), char="-")
+            sc.update()
+    finally:
+        TM.context.fast_render = previous
+    # Every line is a JSON frame - no markup from direct writes in between
+    frames = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert len(frames) == 2
+    rows = []
+    for frame in frames:
+        _apply_patch(rows, frame)
+    expected = ["".join(sc.data.get_row(y)[0]) for y in range(4)]
+    assert ["".join(row) for row in rows] == expected
+    assert "*" in expected[3] and "-" in expected[2]
@@ -1,7 +1,8 @@
 import pytest
 import terminedia.image as IMG
 import terminedia as TM
-from terminedia.values import DEFAULT_FG, Directions as D
+from terminedia.values import DEFAULT_FG, DEFAULT_BG, EMPTY, Directions as D
+from terminedia.utils import Rect
 
 
 # Paletted shape is pending rewrite. Data reading from it should yield a characterless pixel
@@ -172,3 +173,102 @@ def test_create_pixel_from_pixel_str_bool_pick_color_discard_effect():
 def test_shape_factory_yields_full_shape_on_size_parameter():
     sh = TM.shape((1,1))
     assert sh.__class__ is TM.image.FullShape
+
+
+@pytest.mark.parametrize("storage", ["list", "packed"])
+def test_fullshape_storage_engines_read_back_values(storage):
+    sh = IMG.FullShape.new((4, 2), storage=storage)
+    sh.context.color = "red"
+    sh.context.background = (0, 0, 255)
+    sh.context.effects = TM.Effects.blink
+    sh[1, 1] = "*"
+    assert tuple(sh[1, 1]) == ("*", TM.Color("red"), TM.Color("blue"), TM.Effects.blink)
+    assert tuple(sh[0, 0]) == (" ", DEFAULT_FG, TM.DEFAULT_BG, TM.Effects.none)
+    assert sh[0, 0].foreground is DEFAULT_FG
+
+
+def test_fullshape_packed_storage_keeps_special_values():
+    sh = IMG.FullShape.new((4, 2), storage="packed")
+    sh[0, 0] = "あ"  # double width character
+    assert sh.value_data[1] is TM.values.CONTINUATION
+    sh.clear(transparent=True)
+    assert all(component is TM.TRANSPARENT for component in sh[2, 1])
+    assert isinstance(sh.value_data, TM.utils.PackedCharPlane)
+
+
+def test_interned_plane_upgrades_index_size():
+    plane = TM.utils.InternedPlane([0] * 4)
+    plane[1:3] = [1000, 1001]
+    for i in range(300):
+        plane[0] = i
+    assert plane[0] == 299 and plane[1] == 1000
+    assert plane.data.typecode == "H"
+
+
+def test_fullshape_get_row_matches_pixel_reading():
+    sh = TM.shape((5, 3))
+    sh.context.color = "red"
+    sh.draw.line((0, 1), (4, 1), char="*")
+    sh.context.transformers.append(TM.Transformer(char=lambda char, pos: char if pos.x % 2 else "."))
+    sprite = sh.sprites.add(TM.shape((2, 2)), pos=(1, 0))
+    sprite.shape[0, 1] = "#"
+    row = sh.get_row(1, 0, 5)
+    assert list(zip(*row)) == [tuple(sh[x, 1]) for x in range(5)]
+    assert row[0] == [".", "#", ".", "*", "."]
+
+
+def test_shape_get_region_on_view_and_clipping():
+    sh = TM.shape((4, 4))
+    sh[2, 2] = "A"
+    view = sh[Rect((1, 1), (4, 4))]
+    region = view.get_region(Rect((0, 0), (10, 2)))
+    assert len(region) == 2
+    assert region[1][0] == [" ", "A", " "]
+
+
+@pytest.mark.parametrize("storage", ["list", "packed"])
+def test_fullshape_blit_span_copy_matches_pixel_by_pixel(storage):
+    src = TM.shape((4, 3))
+    src.context.color = "red"
+    src.draw.line((0, 1), (3, 1), char="*")
+    with src.context(force_transparent_ink=True):
+        src[1, 1] = TM.TRANSPARENT
+    src.context.background = TM.TRANSPARENT
+    src[2, 0] = "#"
+
+    results = []
+    for fast in (True, False):
+        target = IMG.FullShape.new((6, 4), storage=storage)
+        target.draw.fill(char=".")
+        if not fast:
+            target.draw.target = None
+        target.dirty_clear()
+        target.draw.blit((3, 0), src, roi=(0, 0, 3, 3))
+        results.append([tuple(target[x, y]) for y in range(4) for x in range(6)])
+    assert results[0] == results[1]
+    assert target[3, 1].value == "*" and target[4, 1].value == "."
+    assert target[5, 0].background == DEFAULT_BG
+    assert target.dirty_region
+
+
+def test_sprite_index_follows_moves_and_order():
+    sh = TM.shape((40, 40))
+    sh.sprites.index_cell_size = 4
+    sprites = []
+    for i, char in enumerate("abc"):
+        sprite_shape = TM.shape((3, 3))
+        sprite_shape.draw.fill(char=char)
+        sprites.append(sh.sprites.add(sprite_shape, pos=(i * 2, 0)))
+    # First sprite in the container is composed on top:
+    assert sh[2, 1].value == "a"
+    assert sh[4, 1].value == "b"
+
+    sprites[0].pos = (30, 30)
+    assert sh[2, 1].value == "b"
+    assert sh[31, 31].value == "a"
+    assert sh[1, 1].value == EMPTY
+    assert sh.get_row(31, 29, 34)[0] == [EMPTY, "a", "a", "a", EMPTY]
+
+    del sh.sprites[1]
+    assert sh[2, 1].value == EMPTY
+    assert sh[4, 1].value == "c"
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from terminedia.input import AsyncKeyboard, KeyCodes, _split_keys
+
+
+def test_split_keys_keeps_escape_sequences_together():
+    assert _split_keys("ab" + KeyCodes.UP + "ç" + KeyCodes.F5 + "\x1b[1;5A" + KeyCodes.ESC) == [
+        "a", "b", KeyCodes.UP, "ç", KeyCodes.F5, "\x1b[1;5A", KeyCodes.ESC
+    ]
+    with pytest.raises(KeyboardInterrupt):
+        _split_keys("a\x03")
+    assert _split_keys("\x03", break_=False) == ["\x03"]
+
+
+def test_split_keys_ends_alt_sequences_after_one_key():
+    assert _split_keys("\x1bab") == ["\x1ba", "b"]
+    assert _split_keys("\x1ba\x1bOPx") == ["\x1ba", "\x1bOP", "x"]
+
+
+def test_async_keyboard_queues_decoded_keys():
+    async def read_keys():
+        reader = AsyncKeyboard()
+        reader.queue = asyncio.Queue()
+        reader.feed("x" + KeyCodes.LEFT)
+        keys = []
+        async for key in reader:
+            keys.append(key)
+            if len(keys) == 2:
+                break
+        return keys
+
+    assert asyncio.run(read_keys()) == ["x", KeyCodes.LEFT]
+
+
+def test_async_keyboard_stops_at_end_of_input():
+    import os
+
+    async def read_keys(fd):
+        reader = AsyncKeyboard()
+        reader._attach(fd)
+        keys = [key async for key in reader]
+        with pytest.raises(EOFError):
+            await reader.get()
+        return keys, reader
+
+    read_fd, write_fd = os.pipe()
+    os.write(write_fd, b"ab\x1b[D")
+    os.close(write_fd)
+    try:
+        keys, reader = asyncio.run(asyncio.wait_for(read_keys(read_fd), 5))
+    finally:
+        os.close(read_fd)
+    assert keys == ["a", "b", KeyCodes.LEFT]
+    assert reader.closed
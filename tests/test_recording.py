@@ -0,0 +1,101 @@
+import io
+import json
+from unittest import mock
+
+import terminedia as TM
+from terminedia.recording import DELTA, KEYFRAME, Player, Recorder
+
+from conftest import virtual_terminal_feed
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _record_frames(keyframe_interval=2.5):
+    shape = TM.shape((10, 3))
+    clock = FakeClock()
+    log = io.BytesIO()
+    recorder = Recorder(log, shape.size, keyframe_interval=keyframe_interval, clock=clock)
+    displayed = []
+    for i in range(8):
+        clock.now = float(i)
+        shape[i, 1] = str(i)
+        recorder.record(shape, [TM.Rect((i, 1), (i + 1, 2))])
+        displayed.append(["".join(shape.get_row(y)[0]) for y in range(3)])
+    # Unchanged contents do not produce a frame
+    clock.now = 8.0
+    recorder.record(shape)
+    recorder.close()
+    log.seek(0)
+    return Player(log), displayed
+
+
+def test_recorder_stores_deltas_and_periodic_keyframes():
+    player, displayed = _record_frames()
+    assert player.size == (10, 3)
+    assert player.timestamps == [float(i) for i in range(8)]
+    kinds = [entry[1] for entry in player.index]
+    assert kinds == [KEYFRAME, DELTA, DELTA, KEYFRAME, DELTA, DELTA, KEYFRAME, DELTA]
+    assert [cell[:3] for cell in player._cells(2)] == [(2, 1, "2")]
+
+
+def test_player_seek_starts_from_nearest_keyframe():
+    player, displayed = _record_frames()
+    with mock.patch.object(player, "_cells", wraps=player._cells) as decoded:
+        frame, next_index = player.seek(5.5)
+    assert next_index == 6
+    # Frames 3 (keyframe), 4 and 5 only
+    assert [call.args[0] for call in decoded.call_args_list] == [3, 4, 5]
+    assert ["".join(frame.get_row(y)[0]) for y in range(3)] == displayed[5]
+
+
+def test_player_output_reproduces_recorded_frames():
+    player, displayed = _record_frames()
+    output = io.StringIO()
+    player.play(speed=0, start=2, end=4, file=output)
+    terminal = [[" "] * 10 for _ in range(3)]
+    virtual_terminal_feed(terminal, output.getvalue(), [0, 0])
+    assert ["".join(row) for row in terminal] == displayed[4]
+
+
+def test_export_asciicast():
+    player, displayed = _record_frames()
+    output = io.StringIO()
+    player.export_asciicast(output)
+    lines = output.getvalue().splitlines()
+    assert json.loads(lines[0]) == {"version": 2, "width": 10, "height": 3}
+    events = [json.loads(line) for line in lines[1:]]
+    assert [event[0] for event in events] == [float(i) for i in range(8)]
+    assert all(event[1] == "o" for event in events)
+    terminal = [[" "] * 10 for _ in range(3)]
+    cursor = [0, 0]
+    for event in events:
+        cursor = virtual_terminal_feed(terminal, event[2], cursor)
+    assert ["".join(row) for row in terminal] == displayed[-1]
+
+
+def test_screen_update_feeds_recorder():
+    sc = TM.Screen((10, 3))
+    sc.recorder = recorder = mock.Mock()
+    sc[2, 1] = "*"
+    with mock.patch("sys.stdout", io.StringIO()):
+        sc.update()
+    assert recorder.record.call_args.args[0] is sc.data
+    assert recorder.record.call_args.args[1]
+
+
+def test_screen_aupdate_feeds_recorder():
+    import asyncio
+
+    sc = TM.Screen((10, 3))
+    sc.recorder = recorder = mock.Mock()
+    sc.data[2, 1] = "*"
+    with mock.patch("sys.stdout", io.StringIO()), mock.patch("terminedia.screen.awrite_all", mock.AsyncMock()):
+        asyncio.run(sc.aupdate())
+    assert recorder.record.call_args.args[0] is sc.data
+    assert recorder.record.call_args.args[1]
@@ -6,15 +6,16 @@ import pytest
 import terminedia as TM
 from terminedia.values import TRANSPARENT, EMPTY
 
-from conftest import rendering_test, fast_and_slow_render_mark
+from conftest import rendering_test, fast_and_slow_render_mark, fast_render_mark, virtual_terminal_feed
 
 
 def strip_ansi_seqs(text):
-    return re.sub(r"\x1b\[[0-9;?]*?[a-zA-Z]", "", text)
+    # (carriage return and line feed are used as cursor movements as well)
+    return re.sub(r"\x1b\[[0-9;?]*?[a-zA-Z]|\r|\n", "", text)
 
 
 def strip_ansi_movement(text):
-    return re.sub(r"(\x1b\[[0-9;]+?[ABCDH]|\n)", "", text, re.MULTILINE)
+    return re.sub(r"(\x1b\[[0-9;]*?[ABCDGH]|\r|\n)", "", text, re.MULTILINE)
 
 
 def strip_ansi_default_colors(text):
@@ -217,3 +218,397 @@ def test_render_transparent_characters_dont_overwrite_terminal_contents():
     # Actual render optimizations won't place a 'move' for each non displayed pixel.
     # assert data.count("[MOVE") == 8
     assert re.sub(r"\[.+?\]", "", data).count(EMPTY) == 0
+
+
+
+def _render_update(sc, *args):
+    stdout = io.StringIO()
+    with mock.patch("sys.stdout", stdout):
+        sc.update(*args)
+    return stdout.getvalue()
+
+
+@pytest.mark.parametrize(*fast_render_mark)
+def test_diff_render_only_issues_changed_cells(set_render_method):
+    set_render_method()
+    sc = TM.Screen(size=(5, 3), diff_render=True)
+    sc.data.draw.line((0, 0), (4, 0), char="#")
+    data = strip_ansi_seqs(_render_update(sc))
+    assert data.count("#") == 5
+
+    sc.data[2, 0] = "*"
+    assert strip_ansi_seqs(_render_update(sc)) == "*"
+
+    assert _render_update(sc, (0, 0)) == ""
+
+    sc.data.context.color = (255, 0, 0)
+    sc.data[2, 0] = "*"
+    data = ansi_colors_to_markup(_render_update(sc, (0, 0)))
+    assert "[foreground: (255, 0, 0)]" in data
+    assert strip_ansi_seqs(data).endswith("*")
+
+
+@pytest.mark.parametrize(*fast_render_mark)
+def test_diff_render_keeps_double_width_chars_whole(set_render_method):
+    set_render_method()
+    sc = TM.Screen(size=(5, 1), diff_render=True)
+    sc.data.text[1].at((0, 0), "a\u4e00b")
+    assert "\u4e00" in _render_update(sc)
+
+    sc.data[1, 0] = "c"
+    sc.data[2, 0] = "d"
+    data = strip_ansi_seqs(_render_update(sc))
+    assert data == "cd"
+
+    sc.data.text[1].at((0, 0), "\u4e00")
+    data = strip_ansi_seqs(_render_update(sc))
+    assert data.startswith("\u4e00")
+
+
+def test_sgr_transitions_are_cached_and_shared():
+    from terminedia.terminal import sgr_transition, sgr_transition_cache, ScreenCommands
+
+    red, blue = TM.Color("red"), TM.Color("blue")
+    previous = (red.packed, TM.DEFAULT_BG.packed, int(TM.Effects.bold))
+    new = (blue.packed, None, int(TM.Effects.underline))
+    sequence = sgr_transition(previous, new, (blue, None))
+    assert sequence == "\x1b[38;2;0;0;255;22;4m"
+    assert sgr_transition_cache[previous, new, 24] == sequence
+    assert sgr_transition(previous, previous) == ""
+
+    with mock.patch("terminedia.terminal.SGR_CACHE_SIZE", 10):
+        for i in range(50):
+            sgr_transition(previous, (i, None, None), (TM.Color((0, 0, i)), None))
+        assert 0 < len(sgr_transition_cache) <= 10
+
+    stdout = io.StringIO()
+    commands = ScreenCommands()
+    commands.set_fg_color(blue, file=stdout)
+    commands.set_bg_color(TM.DEFAULT_BG, file=stdout)
+    commands.set_effects(TM.Effects.underline | TM.Effects.encircled, file=stdout)
+    output = stdout.getvalue()
+    assert output.startswith("\x1b[38;2;0;0;255m\x1b[49m\x1b[")
+    assert ";4;" in output
+    assert commands.active_unicode_effects == TM.Effects.encircled
+
+
+def test_effects_reset_after_unknown_effects_keeps_colors():
+    from terminedia.terminal import ScreenCommands
+
+    red, blue = TM.Color("red"), TM.Color("blue")
+    cells = [
+        (0, 0, "a", red, blue, TM.TRANSPARENT),
+        (1, 0, "b", red, blue, TM.Effects.none),
+        (2, 0, "c", red, blue, TM.Effects.none),
+    ]
+    output = ScreenCommands().encode_cells(cells, {"last_pos": None})
+    # The reset needed for the unknown effects also resets the colors: these are sent again
+    assert output.endswith("a\x1b[0;38;2;255;0;0;48;2;0;0;255mbc")
+
+    # Colors kept from earlier output are no longer known after a reset
+    cells = [
+        (0, 0, "a", TM.TRANSPARENT, TM.TRANSPARENT, TM.Effects.none),
+        (1, 0, "b", red, blue, TM.Effects.none),
+    ]
+    state = {"last_pos": (0, 0), "fg": red.packed, "bg": blue.packed, "tm_effects": None}
+    output = ScreenCommands().encode_cells(cells, state)
+    assert output == "\x1b[0ma\x1b[38;2;255;0;0;48;2;0;0;255mb"
+
+
+@pytest.mark.parametrize("diff_render", [False, True])
+def test_cursor_movement_planner_output_reproduces_screen(diff_render):
+    import random
+    from terminedia.terminal import cursor_movement
+
+    assert cursor_movement((3, 2), (5, 2)) == "\x1b[2C"
+    assert cursor_movement((10, 2), (0, 3)) == "\r\n"
+    assert cursor_movement((None, 2), (4, 2)) == "\x1b[5G"
+    assert cursor_movement((3, 2), (1, 2), relative_only=True) == "\x1b[2D"
+
+    TM.context.fast_render = True
+    rnd = random.Random(7)
+    sc = TM.Screen(size=(30, 8), diff_render=diff_render)
+    terminal = [[" "] * 30 for _ in range(8)]
+    cursor = [0, 0]
+    for frame in range(6):
+        for i in range(15):
+            sc.data[rnd.randrange(30), rnd.randrange(8)] = rnd.choice("abc#")
+        output = _render_update(sc, (0, 0)) if not diff_render else _render_update(sc)
+        cursor = virtual_terminal_feed(terminal, output, cursor)
+        assert ["".join(row) for row in terminal] == ["".join(sc.data.get_row(y)[0]) for y in range(8)]
+
+
+@pytest.mark.parametrize("diff_render", [False, True])
+def test_run_length_encoding_output_reproduces_screen(diff_render):
+    TM.context.fast_render = True
+    outputs = {}
+    for run_length in (False, True):
+        sc = TM.Screen(size=(40, 6), diff_render=diff_render)
+        sc.commands.run_length_encoding = run_length
+        terminal = [["*"] * 40 for _ in range(6)]
+        sc.data.draw.line((0, 1), (39, 1), char="-")
+        sc.data.draw.line((2, 3), (30, 3), char="#")
+        sc.data[5, 4] = "x"
+        output = _render_update(sc, (0, 0)) if not diff_render else _render_update(sc)
+        virtual_terminal_feed(terminal, output, [0, 0])
+        assert ["".join(row) for row in terminal] == ["".join(sc.data.get_row(y)[0]) for y in range(6)]
+        outputs[run_length] = output
+
+    assert "\x1b[39b" in outputs[True] and "\x1b[28b" in outputs[True]
+    assert "X" in outputs[True]
+    assert len(outputs[True]) < len(outputs[False]) // 2
+
+
+@pytest.mark.parametrize(*fast_and_slow_render_mark)
+@pytest.mark.parametrize("color_depth, expected", [(24, "38;2;250;5;3"), (8, "38;5;196"), (4, "91")])
+def test_screen_color_depth_selects_color_sequences(set_render_method, color_depth, expected):
+    set_render_method()
+    sc = TM.Screen(size=(10, 2), color_depth=color_depth)
+    sc.data.context.color = (250, 5, 3)
+    sc.data[1, 0] = "*"
+    output = _render_update(sc, (0, 0))
+    assert re.search(rf"\x1b\[([0-9;]*;)?{expected}[;m]", output)
+
+
+@pytest.mark.parametrize(*fast_and_slow_render_mark)
+def test_synchronized_update_writes_each_frame_at_once(set_render_method):
+    from terminedia.terminal import SYNCHRONIZED_UPDATE_BEGIN, SYNCHRONIZED_UPDATE_END
+
+    set_render_method()
+    sc = TM.Screen(size=(10, 3), synchronized_update=True)
+    sc.data.draw.line((0, 0), (9, 0), char="#")
+    sc.data.context.color = "red"
+    sc.data[3, 2] = "*"
+    stdout = mock.Mock(wraps=io.StringIO())
+    with mock.patch("sys.stdout", stdout):
+        sc.update((0, 0))
+    assert stdout.write.call_count == 1
+    output = stdout.write.call_args[0][0]
+    assert output.startswith(SYNCHRONIZED_UPDATE_BEGIN) and output.endswith(SYNCHRONIZED_UPDATE_END)
+    assert strip_ansi_seqs(output).startswith("#" * 10)
+
+
+def test_write_all_resends_data_not_taken_by_clogged_output():
+    import errno
+    from terminedia.terminal import write_all
+
+    class CloggedBuffer(io.BytesIO):
+        clogged = 2
+
+        def write(self, data):
+            if self.clogged:
+                self.clogged -= 1
+                super().write(bytes(data[:3]))
+                raise BlockingIOError(errno.EAGAIN, "clogged", 3)
+            return super().write(data)
+
+    buffer = CloggedBuffer()
+    file = io.TextIOWrapper(buffer, encoding="utf-8")
+    waited = write_all(file, "\x1b[1;1Hárvore\x1b[0m")
+    assert buffer.getvalue().decode("utf-8") == "\x1b[1;1Hárvore\x1b[0m"
+    assert waited > 0
+
+
+def test_frame_pacer_drops_frames_while_output_is_blocked():
+    import errno
+
+    class CloggedOutput(io.StringIO):
+        clogged = True
+
+        def write(self, text):
+            if self.clogged:
+                self.clogged = False
+                raise BlockingIOError(errno.EAGAIN, "clogged", 0)
+            return super().write(text)
+
+    TM.context.fast_render = True
+    sc = TM.Screen(size=(10, 3))
+    pacer = TM.FramePacer(sc, fps=1000)
+    sc.data[0, 0] = "a"
+    with mock.patch("sys.stdout", CloggedOutput()), \
+            mock.patch("terminedia.terminal._wait_writable", return_value=0.5):
+        assert pacer.update(wait=False)
+        sc.data[1, 0] = "b"
+        assert not pacer.update(wait=False)
+    assert (pacer.rendered_frames, pacer.dropped_frames) == (1, 1)
+    assert pacer.drain_rate > 0
+
+    # Once the terminal catches up, the changes made meanwhile are rendered
+    pacer.busy_until = 0
+    stdout = io.StringIO()
+    with mock.patch("sys.stdout", stdout):
+        assert pacer.update(wait=False)
+    assert "b" in strip_ansi_seqs(stdout.getvalue())
+
+
+def test_aupdate_writes_frame_through_event_loop():
+    import asyncio
+    import os
+
+    TM.context.fast_render = True
+    sc = TM.Screen(size=(10, 3))
+    sc.data.draw.line((0, 1), (9, 1), char="=")
+    read_fd, write_fd = os.pipe()
+    with open(write_fd, "w") as stdout, mock.patch("sys.stdout", stdout):
+        asyncio.run(sc.aupdate())
+    with open(read_fd) as output:
+        assert strip_ansi_seqs(output.read()).strip() == "=" * 10
+
+
+def test_render_thread_renders_committed_frames():
+    import threading
+
+    TM.context.fast_render = True
+    sc = TM.Screen(size=(10, 3), render_thread=True)
+    stdout = io.StringIO()
+    with mock.patch("sys.stdout", stdout):
+        sc.data.draw.line((0, 0), (9, 0), char="#")
+        sc.commit()
+        assert sc.wait_render(timeout=5)
+        assert strip_ansi_seqs(stdout.getvalue()).strip() == "#" * 10
+
+        # Frames committed while the thread is busy are merged
+        release = threading.Event()
+        original = sc.commands.diff_render
+        calls = []
+
+        def slow_diff_render(*args, **kwargs):
+            calls.append(args)
+            release.wait(5)
+            return original(*args, **kwargs)
+
+        stdout.truncate(0); stdout.seek(0)
+        with mock.patch.object(sc.commands, "diff_render", slow_diff_render):
+            sc.data[0, 1] = "a"
+            sc.commit()
+            sc.data[1, 1] = "b"
+            sc.commit()
+            sc.data[2, 2] = "c"
+            sc.commit()
+            release.set()
+            assert sc.wait_render(timeout=5)
+        sc.stop_render_thread()
+    assert len(calls) <= 2
+    assert strip_ansi_seqs(stdout.getvalue()) == "abc"
+
+
+def test_render_thread_recovers_from_render_errors():
+    TM.context.fast_render = True
+    sc = TM.Screen(size=(10, 3), render_thread=True)
+    stdout = io.StringIO()
+    original = sc.commands.diff_render
+    with mock.patch("sys.stdout", stdout):
+        with mock.patch.object(sc.commands, "diff_render", side_effect=OSError("closed")):
+            sc.data[0, 0] = "a"
+            sc.commit()
+            with pytest.raises(OSError):
+                sc.wait_render(timeout=5)
+        assert sc._render_worker is None
+        # The thread is started again, and renders the failed frame along with the new one
+        sc.data[1, 1] = "b"
+        sc.commit()
+        assert sc.wait_render(timeout=5)
+        sc.stop_render_thread()
+    assert strip_ansi_seqs(stdout.getvalue()).split() == ["a", "b"]
+
+    # Errors not collected by wait_render are raised by the next commit
+    with mock.patch.object(sc.commands, "diff_render", side_effect=OSError("closed")):
+        sc.data[2, 2] = "c"
+        sc.commit()
+        worker = sc._render_worker
+        if worker is not None:
+            worker.join(5)
+        with pytest.raises(OSError):
+            sc.commit()
+
+
+def test_render_thread_direct_writes_are_left_to_the_render_thread():
+    TM.context.fast_render = True
+    sc = TM.Screen(size=(10, 3), render_thread=True)
+    stdout = io.StringIO()
+    with mock.patch("sys.stdout", stdout):
+        sc.draw.line((0, 1), (9, 1), char="=")
+        sc[2, 2] = "*"
+        assert stdout.getvalue() == ""
+        assert sc.front_buffer.rows == [None] * 3
+        with mock.patch.object(sc.commands, "print_at") as print_at:
+            sc.update()
+            assert sc.wait_render(timeout=5)
+        sc.stop_render_thread()
+    print_at.assert_not_called()
+    assert strip_ansi_seqs(stdout.getvalue()).split() == ["=" * 10, "*"]
+
+
+def test_bytes_output_writes_encoded_frames_to_file_descriptor():
+    import os
+
+    TM.context.fast_render = True
+    read_fd, write_fd = os.pipe()
+    with open(write_fd, "w") as stdout, mock.patch("sys.stdout", stdout):
+        sc = TM.Screen(size=(6, 2), bytes_output=True)
+        assert sc.commands.output.fileno() == write_fd
+        sc.data[0, 0] = "ç"
+        sc.data[3, 1] = "#"
+        sc.update()
+    with open(read_fd, "rb") as output:
+        text = strip_ansi_seqs(output.read().decode("utf-8"))
+    assert "ç" in text and "#" in text
+
+
+def test_shape_render_to_binary_file():
+    shape = TM.shape((4, 1))
+    shape.draw.line((0, 0), (3, 0), char="é")
+    text_output, binary_output = io.StringIO(), io.BytesIO()
+    shape.render(output=text_output)
+    shape.render(output=binary_output)
+    assert binary_output.getvalue() == text_output.getvalue().encode("utf-8")
+    assert "é" in text_output.getvalue()
+
+
+def test_journal_keeps_only_latest_write_per_cell():
+    commands = TM.JournalingScreenCommands()
+    commands.__enter__()
+    for i in range(100):
+        commands.print_at((3, 1), str(i % 10))
+    commands.print_at((0, 1), "ab")
+    commands.print_at((1, 0), "c")
+    commands.stop_journal()
+    assert [entry[0] for entry in commands.journal[1] if entry] == ["a", "b", "9"]
+    assert commands.journal_history is None
+    output = io.StringIO()
+    commands.replay(output)
+    assert strip_ansi_seqs(output.getvalue()) == "cab9"
+
+    commands.keep_history = True
+    commands.__enter__()
+    commands.print_at((0, 0), "x")
+    commands.print_at((0, 0), "y")
+    commands.stop_journal()
+    assert [entry[:2] for entry in commands.journal_history[0, 0]] == [(0, "x"), (1, "y")]
+
+
+@pytest.mark.parametrize(*fast_and_slow_render_mark)
+def test_batch_interval_defers_direct_screen_writes(set_render_method):
+    import time
+    from terminedia.input import _flush_pending_output
+
+    set_render_method()
+    sc = TM.Screen(size=(10, 3), batch_interval=0)
+    stdout = io.StringIO()
+    with mock.patch("sys.stdout", stdout):
+        sc.draw.line((0, 1), (9, 1), char="-")
+        sc[2, 2] = "x"
+        assert stdout.getvalue() == ""
+        assert sc.data[2, 2].value == "x"
+        # Reading the keyboard renders pending output
+        _flush_pending_output()
+        first = strip_ansi_seqs(stdout.getvalue())
+        assert "-" * 10 in first and "x" in first
+
+        sc.batch_interval = 0.01
+        sc[0, 0] = "y"
+        for i in range(100):
+            time.sleep(0.01)
+            if "y" in stdout.getvalue():
+                break
+        assert "y" in strip_ansi_seqs(stdout.getvalue())
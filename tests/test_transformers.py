@@ -144,6 +144,65 @@ def test_transformers_container_bake_method_for_source_consuming_transformers():
     joiner = lambda d: '\n'.join(''.join(char for char in d[i: i + 5]) for i in range(0, 5 * 5, 5))
     assert joiner(sh.value_data) == joiner(reference_shape.value_data)
 
+@pytest.mark.parametrize("mask_diags", [True, False])
+def test_kernel_transformer_table_matches_neighbourhood_strings(mask_diags):
+    import random
+    from terminedia.transformers import KernelTransformer
+    from terminedia.transformers.library import box_light_table_transformer
+
+    kernel = box_light_table_transformer.kernel
+    transformer = KernelTransformer(kernel, mask_diags=mask_diags)
+    rnd = random.Random(3)
+    sh = TM.shape((12, 7))
+    for i in range(40):
+        sh[rnd.randrange(12), rnd.randrange(7)] = "#"
+
+    def reference(x, y):
+        key = ""
+        for dy in -1, 0, 1:
+            for dx in -1, 0, 1:
+                in_bounds = 0 <= x + dx < 12 and 0 <= y + dy < 7
+                masked = mask_diags and dx and dy
+                key += "#" if in_bounds and not masked and sh.value_data[(y + dy) * 12 + x + dx] != " " else " "
+        return kernel.get(key, kernel.get("default", " "))
+
+    expected = [[reference(x, y) for x in range(12)] for y in range(7)]
+    assert [[transformer.kernel_match(sh, TM.V2(x, y)) for x in range(12)] for y in range(7)] == expected
+
+    sh.context.transformers.append(transformer)
+    assert [sh.get_row(y)[0] for y in range(7)] == expected
+    assert [[sh[x, y].value for x in range(12)] for y in range(7)] == expected
+
+
+def test_kernel_transformer_table_follows_in_place_kernel_changes():
+    sh = TM.shape((3, 1))
+    sh[1, 0] = "*"
+    transformer = TM.transformers.KernelTransformer({"default": "."})
+    assert transformer.kernel_match_row(sh, TM.V2(0, 0), 3) == [".", ".", "."]
+    transformer.kernel["default"] = "+"
+    assert transformer.kernel_match_row(sh, TM.V2(0, 0), 3) == ["+", "+", "+"]
+
+
+def test_transformers_compiled_pipeline_is_invalidated_on_changes():
+    sh = TM.shape((3,1))
+    sh.draw.line((0, 0), (2, 0), char="*")
+    tr = TM.Transformer(char=lambda char, pos: char if pos.x else ".")
+    sh.context.transformers.append(tr)
+    assert sh.context.transformers.compile() is sh.context.transformers.compile()
+    assert sh.get_row(0)[0] == [".", "*", "*"]
+
+    tr.char = "#"
+    assert sh[1, 0].value == "#"
+    with sh.context(transformers=TM.TransformersContainer([tr])):
+        tr.char = "-"
+        assert sh.get_row(0)[0] == ["-", "-", "-"]
+
+    sh.context.transformers.append(TM.Transformer(char=lambda value, tick: value * 2))
+    assert sh[0, 0].value == "--"
+    del sh.context.transformers[1]
+    assert sh[0, 0].value == "-"
+
+
 ## GradientTransformer tests
 
 def screen_shape_sprite():
@@ -168,6 +227,18 @@ def test_gradient_transformer_works():
     assert sc.data[25,5].foreground == Color((255, 255, 255))
 
 
+def test_gradient_transformer_channel_reassigned_on_instance_is_used():
+    sh = TM.shape((10, 1))
+    sh.draw.line((0, 0), (9, 0), char="*")
+    tr = GradientTransformer(TM.ColorGradient([(0, (0, 0, 0)), (1, (1, 1, 1))]))
+    sh.context.transformers.append(tr)
+    assert sh.get_row(0)[1][-1] == Color((255, 255, 255))
+
+    tr.foreground = lambda: Color((255, 0, 0))
+    assert sh.get_row(0)[1] == [Color((255, 0, 0))] * 10
+    assert sh[5, 0].foreground == Color((255, 0, 0))
+
+
 @pytest.mark.parametrize(*fast_render_mark)
 @rendering_test
 def test_gradient_transformer_works_with_background_channel():
@@ -325,3 +396,48 @@ def test_gradient_transformer_with_horizontal_size_with_repeat_truncate_and_offs
     assert sc.data[5, 5].foreground == Color((0, 0, 0))
     assert sc.data[14,5].foreground == Color((255, 255, 255))
     assert sc.data[19, 5].foreground == Color((255, 0, 0))
+
+
+def test_gradient_transformer_table_follows_gradient_and_target_changes():
+    gr = TM.ColorGradient([(0, (0, 0, 0)), (1, (255, 255, 255))])
+    tr = GradientTransformer(gr, channel="background")
+    sh = TM.shape((11, 2))
+    sh.context.transformers.append(tr)
+    assert sh[10, 0].background == Color((255, 255, 255))
+    assert sh.get_row(1)[2][0] == Color((0, 0, 0))
+
+    gr[1] = (255, 0, 0)
+    assert sh[10, 0].background == Color((255, 0, 0))
+
+    tr.direction = D.DOWN
+    assert sh[10, 1].background == Color((255, 0, 0))
+    assert sh[10, 0].background == Color((0, 0, 0))
+
+    other = TM.shape((3, 3))
+    other.context.transformers.append(tr)
+    assert other[0, 2].background == Color((255, 0, 0))
+
+
+def test_tick_transformers_only_invalidate_their_rect_once_per_period():
+    from terminedia.utils import tick_forward
+    sh = TM.shape((40, 20))
+    spinner = TM.Transformer(char=lambda tick: "|/-\\"[tick % 4], rect=(2, 2, 3, 3), period=2)
+    sh.context.transformers.append(spinner)
+    static = TM.Transformer(char=lambda value: value)
+    sh.context.transformers.append(static)
+    sh.dirty_rects
+    sh.dirty_clear()
+
+    changed = []
+    for i in range(4):
+        tick_forward()
+        changed.append(sh.dirty_rects)
+        sh.dirty_clear()
+    assert [bool(rects) for rects in changed].count(True) == 2
+    for rects in changed:
+        assert rects in (set(), {(0, 0, 8, 8)})
+
+    spinner.rect = None
+    tick_forward()
+    tick_forward()
+    assert sh.dirty_rects == {(0, 0, 40, 20)}
@@ -7,7 +7,7 @@ from terminedia import Color
 
 from terminedia.utils import combine_signatures, TaggedDict, HookList
 from terminedia.utils.descriptors import ObservableProperty
-from terminedia.utils import Rect, V2, Gradient, EPSILON
+from terminedia.utils import Rect, V2, Gradient, EPSILON, DirtyRegion
 
 
 def test_combine_signatures_works():
@@ -473,3 +473,30 @@ def test_rect_constructor(args, kwargs):
 def test_rect_constructor_with_expected_result(args, kwargs, expected):
     r = Rect(*args, **kwargs)
     assert r == Rect(*expected)
+
+
+def test_dirty_region_coalesces_tiles_in_rects():
+    region = DirtyRegion((20, 20), tile_size=4)
+    assert not region and region.rects() == []
+    region.mark_pixel((1, 1))
+    region.mark_pixel((5, 2))
+    region.mark_rect(Rect((8, 4), (20, 13)))
+    region.mark_span(19, 0, 3)
+    assert region.rects() == [
+        Rect((0, 0), (8, 4)),
+        Rect((8, 4), (20, 16)),
+        Rect((0, 16), (4, 20)),
+    ]
+    region.clear()
+    assert not region
+    region.set_all()
+    assert region.rects() == [Rect((0, 0), (20, 20))]
+
+
+def test_dirty_region_rects_dont_overlap():
+    region = DirtyRegion((7, 5), tile_size=1)
+    region.mark_rect((0, 0, 3, 3))
+    region.mark_rect((1, 1, 5, 4))
+    region.mark_rect((-3, -3, 1, 1))
+    cells = [cell for rect in region.rects() for cell in rect.iter_cells()]
+    assert len(cells) == len(set(cells)) == 9 + 12 - 4